@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Serveur Pipedrive local pour les benchmarks
+Génère des données synthétiques à la demande et simule latence et rate limit
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlparse
+
+FIELDS_ENTITIES = {
+    "activityFields": "activity",
+    "organizationFields": "organization",
+    "personFields": "person",
+    "productFields": "product",
+    "dealFields": "deal",
+}
+# endpoints de liste demandés avec le sélecteur `:(id)` par la réconciliation des suppressions
+LIST_ENDPOINTS = {
+    "activities": "activity",
+    "deals": "deal",
+    "notes": "note",
+    "organizations": "organization",
+    "persons": "person",
+    "products": "product",
+}
+# entités de configuration: peu de lignes quelle que soit l'échelle
+SMALL_ENTITIES = {"activityType", "filter", "pipeline", "stage", "user"}
+CUSTOM_FIELD_TYPES = [
+    "varchar",
+    "double",
+    "monetary",
+    "date",
+    "enum",
+    "set",
+    "int",
+    "text",
+]
+FLOW_OBJECTS = ["dealChange", "activity", "note"]
+START_TIME = datetime(2020, 1, 1)
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# comme pipedrive, les en-têtes de rate limit sont toujours envoyés, avec cette limite si aucune n'est simulée
+UNLIMITED_RATE = 100000
+
+
+class MockConfig:
+    """Échelle des données et comportement simulé du serveur"""
+
+    def __init__(
+        self,
+        rows=1000,
+        custom_fields=50,
+        enum_options=10,
+        flow_entries=5,
+        participants=2,
+        latency_ms=0.0,
+        rate_limit=0,
+        rate_window=2.0,
+        fail_recents_from=None,
+        deleted_ids=(),
+        mid_scan_deletes=None,
+        server_errors=0,
+    ):
+        self.rows = rows
+        self.custom_fields = custom_fields
+        self.enum_options = enum_options
+        self.flow_entries = flow_entries
+        self.participants = participants
+        self.latency_ms = latency_ms
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        # /recents répond en erreur à partir de ce start de pagination, pour simuler une exécution interrompue
+        self.fail_recents_from = fail_recents_from
+        # ids absents des endpoints de liste, comme des enregistrements supprimés dans pipedrive
+        self.deleted_ids = sorted(deleted_ids)
+        # (start, ids): ces ids sont supprimés quand une page de liste est demandée à partir de ce start,
+        # comme des enregistrements supprimés pendant un scan
+        self.mid_scan_deletes = mid_scan_deletes
+        # les prochaines requêtes répondent 503, pour simuler des erreurs serveur passagères
+        self.server_errors = server_errors
+
+
+class MockStats:
+    """Compteurs exposés sur /_stats"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.bytes_sent = 0
+        self.window_started_at = time.monotonic()
+        self.window_requests = 0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+def _custom_field_key(entity, index):
+    return hashlib.sha1(f"{entity}-{index}".encode()).hexdigest()
+
+
+def _update_time(row_index):
+    return (START_TIME + timedelta(minutes=row_index)).strftime(TIME_FORMAT)
+
+
+def _row_count(config, entity):
+    return min(config.rows, 20) if entity in SMALL_ENTITIES else config.rows
+
+
+def fields(config, entity):
+    """Définitions des champs d'une entité: quelques champs standards et les champs personnalisés"""
+    items = [
+        {"key": "id", "name": "ID", "field_type": "int", "edit_flag": False},
+        {
+            "key": "update_time",
+            "name": "Update time",
+            "field_type": "date",
+            "edit_flag": False,
+        },
+        {
+            "key": "label",
+            "name": "Label",
+            "field_type": "enum",
+            "edit_flag": False,
+            "options": [{"id": i, "label": f"Label {i}"} for i in range(1, 4)],
+        },
+    ]
+    for index in range(config.custom_fields):
+        field_type = CUSTOM_FIELD_TYPES[index % len(CUSTOM_FIELD_TYPES)]
+        field = {
+            "key": _custom_field_key(entity, index),
+            "name": f"Custom {field_type} {index}",
+            "field_type": field_type,
+            "edit_flag": True,
+        }
+        if field_type in {"enum", "set"}:
+            field["options"] = [
+                {"id": option, "label": f"Option {option}"}
+                for option in range(1, config.enum_options + 1)
+            ]
+        items.append(field)
+    return items
+
+
+def _custom_value(config, field_type, rng):
+    if field_type == "enum":
+        return rng.randint(1, config.enum_options)
+    if field_type == "set":
+        return ",".join(str(rng.randint(1, config.enum_options)) for _ in range(2))
+    if field_type in {"double", "monetary"}:
+        return round(rng.random() * 10000, 2)
+    if field_type == "int":
+        return rng.randint(0, 1000)
+    if field_type == "date":
+        return "2023-06-01"
+    if rng.random() < 0.2:
+        return None
+    return "lorem ipsum " * rng.randint(1, 5)
+
+
+def entity_row(config, entity, row_index):
+    """Ligne déterministe `row_index` d'une entité"""
+    rng = random.Random(f"{entity}-{row_index}")
+    row = {
+        "id": row_index + 1,
+        "name": f"{entity} {row_index + 1}",
+        "update_time": _update_time(row_index),
+        "add_time": _update_time(0),
+        "active_flag": True,
+        "label": rng.randint(1, 3),
+        "owner_id": {"id": 1, "name": "Owner", "email": "owner@example.com"},
+    }
+    if entity == "deal":
+        row.update(
+            title=f"Deal {row_index + 1}",
+            value=round(rng.random() * 10000, 2),
+            stage_id=rng.randint(1, 5),
+            participants_count=config.participants,
+            last_activity_date=None,
+        )
+    if entity == "user":
+        # comme dans pipedrive, les utilisateurs n'ont que `created` et `modified`
+        row["created"] = row.pop("add_time")
+        row["modified"] = row.pop("update_time")
+    if entity in FIELDS_ENTITIES.values():
+        for index in range(config.custom_fields):
+            field_type = CUSTOM_FIELD_TYPES[index % len(CUSTOM_FIELD_TYPES)]
+            row[_custom_field_key(entity, index)] = _custom_value(
+                config, field_type, rng
+            )
+    return row
+
+
+def recents(config, entities, since_timestamp, start, limit):
+    """Page de /recents: les lignes de toutes les entités demandées triées par update_time croissant"""
+    since = datetime.strptime(since_timestamp, TIME_FORMAT)
+    first_row = max(0, int((since - START_TIME).total_seconds() // 60))
+    # index global -> (ligne, entité) en entrelaçant les entités à update_time égal
+    streams = [entity for entity in entities if first_row < _row_count(config, entity)]
+    items = []
+    position = 0
+    row_index = first_row
+    while len(items) < limit and streams:
+        # saute les lignes complètes avant `start` tant que les entités restantes ne changent pas
+        skip = min(
+            (start - position) // len(streams),
+            min(_row_count(config, e) for e in streams) - row_index,
+        )
+        if skip > 0:
+            position += skip * len(streams)
+            row_index += skip
+            streams = [e for e in streams if row_index < _row_count(config, e)]
+            continue
+        for entity in streams:
+            if position >= start and len(items) < limit:
+                data = entity_row(config, entity, row_index)
+                items.append({"item": entity, "id": data["id"], "data": data})
+            position += 1
+        row_index += 1
+        streams = [e for e in streams if row_index < _row_count(config, e)]
+    return items, bool(streams)
+
+
+def leads(config, start, limit):
+    """Page de /leads triée par update_time décroissant"""
+    items = []
+    for position in range(start, min(start + limit, config.rows)):
+        row_index = config.rows - 1 - position
+        row = entity_row(config, "deal", row_index)
+        row["id"] = f"lead-{row_index + 1:08d}"
+        items.append(row)
+    return items, start + limit < config.rows
+
+
+def deal_flow(config, deal_id):
+    items = []
+    for index in range(config.flow_entries):
+        flow_object = FLOW_OBJECTS[index % len(FLOW_OBJECTS)]
+        timestamp = _update_time(deal_id + index)
+        data = {"id": deal_id * 100 + index, "deal_id": deal_id, "add_time": timestamp}
+        if flow_object == "dealChange":
+            data.update(field_key="stage_id", old_value="1", new_value="2")
+        items.append({"object": flow_object, "timestamp": timestamp, "data": data})
+    return items
+
+
+def deal_participants(config, deal_id):
+    return [
+        {
+            "id": deal_id * 100 + index,
+            "person_id": {"value": index + 1, "name": f"person {index + 1}"},
+            "add_time": _update_time(deal_id),
+            "active_flag": True,
+        }
+        for index in range(config.participants)
+    ]
+
+
+def list_ids(config, entity):
+    """Ids d'un endpoint de liste demandé avec `:(id)`, sans les ids supprimés"""
+    deleted_ids = set(config.deleted_ids)
+    return [
+        {"id": row_index + 1}
+        for row_index in range(_row_count(config, entity))
+        if row_index + 1 not in deleted_ids
+    ]
+
+
+def _paginate(items, start, limit):
+    return items[start : start + limit], start + limit < len(items)
+
+
+def make_handler(config, stats):
+    class MockPipedriveHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/_stats":
+                return self._send(200, stats.as_dict(), {})
+            if config.latency_ms:
+                time.sleep(config.latency_ms / 1000)
+            rate_headers = self._rate_limit()
+            if rate_headers is None:
+                return
+            with stats.lock:
+                server_error = config.server_errors > 0
+                config.server_errors -= server_error
+            if server_error:
+                return self._send(
+                    503,
+                    {"success": False, "error": "Service unavailable"},
+                    rate_headers,
+                )
+            params = dict(parse_qsl(url.query))
+            start = int(params.get("start", 0))
+            limit = int(params.get("limit", 100))
+            path = url.path.split("/v1/", 1)[-1]
+            items, more = self._route(path, params, start, limit)
+            if items is None:
+                return self._send(
+                    404, {"success": False, "error": "Not found"}, rate_headers
+                )
+            page = {
+                "success": True,
+                "data": items or None,
+                "additional_data": {
+                    "pagination": {
+                        "start": start,
+                        "limit": limit,
+                        "more_items_in_collection": more,
+                        "next_start": start + limit,
+                    }
+                },
+            }
+            self._send(200, page, rate_headers)
+
+        def _route(self, path, params, start, limit):
+            if path in FIELDS_ENTITIES:
+                return _paginate(fields(config, FIELDS_ENTITIES[path]), start, limit)
+            if path == "recents":
+                if (
+                    config.fail_recents_from is not None
+                    and start >= config.fail_recents_from
+                ):
+                    return None, False
+                return recents(
+                    config,
+                    params["items"].split(","),
+                    params.get("since_timestamp", "1970-01-01 00:00:00"),
+                    start,
+                    limit,
+                )
+            if path == "leads":
+                return leads(config, start, limit)
+            match = re.fullmatch(r"(\w+):\(id\)", unquote(path))
+            if match and match.group(1) in LIST_ENDPOINTS:
+                if config.mid_scan_deletes and start >= config.mid_scan_deletes[0]:
+                    config.deleted_ids = sorted(
+                        set(config.deleted_ids) | set(config.mid_scan_deletes[1])
+                    )
+                    config.mid_scan_deletes = None
+                return _paginate(
+                    list_ids(config, LIST_ENDPOINTS[match.group(1)]), start, limit
+                )
+            match = re.fullmatch(r"deals/(\d+)/(flow|participants)", path)
+            if match:
+                deal_id = int(match.group(1))
+                if match.group(2) == "flow":
+                    return _paginate(deal_flow(config, deal_id), start, limit)
+                return _paginate(deal_participants(config, deal_id), start, limit)
+            return None, False
+
+        def _rate_limit(self):
+            """Fenêtre fixe de `rate_limit` requêtes, répond 429 au-delà"""
+            rate_limit = config.rate_limit or UNLIMITED_RATE
+            with stats.lock:
+                stats.requests += 1
+                now = time.monotonic()
+                if now - stats.window_started_at >= config.rate_window:
+                    stats.window_started_at = now
+                    stats.window_requests = 0
+                stats.window_requests += 1
+                remaining = rate_limit - stats.window_requests
+                reset = config.rate_window - (now - stats.window_started_at)
+                if remaining < 0:
+                    stats.throttled += 1
+            headers = {
+                "x-ratelimit-limit": str(rate_limit),
+                "x-ratelimit-remaining": str(max(remaining, 0)),
+                "x-ratelimit-reset": f"{reset:.2f}",
+            }
+            if remaining < 0:
+                headers["Retry-After"] = f"{reset:.2f}"
+                self._send(
+                    429, {"success": False, "error": "Too many requests"}, headers
+                )
+                return None
+            return headers
+
+        def _send(self, status, payload, headers):
+            body = json.dumps(payload).encode()
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body, compresslevel=1)
+                headers = dict(headers, **{"Content-Encoding": "gzip"})
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with stats.lock:
+                stats.bytes_sent += len(body)
+
+    return MockPipedriveHandler
+
+
+def create_server(config, host="127.0.0.1", port=0):
+    """Crée le serveur, l'api est servie sur http://host:port/v1"""
+    server = ThreadingHTTPServer((host, port), make_handler(config, MockStats()))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur Pipedrive local")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=1000, help="Lignes par entité")
+    parser.add_argument(
+        "--custom-fields", type=int, default=50, help="Champs personnalisés par entité"
+    )
+    parser.add_argument(
+        "--enum-options", type=int, default=10, help="Options des champs enum/set"
+    )
+    parser.add_argument(
+        "--flow-entries", type=int, default=5, help="Entrées de flow par deal"
+    )
+    parser.add_argument(
+        "--participants", type=int, default=2, help="Participants par deal"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Latence ajoutée à chaque requête"
+    )
+    parser.add_argument(
+        "--rate-limit", type=int, default=0, help="Requêtes par fenêtre (0: illimité)"
+    )
+    parser.add_argument(
+        "--rate-window", type=float, default=2.0, help="Durée de la fenêtre en secondes"
+    )
+    args = parser.parse_args()
+
+    config = MockConfig(
+        rows=args.rows,
+        custom_fields=args.custom_fields,
+        enum_options=args.enum_options,
+        flow_entries=args.flow_entries,
+        participants=args.participants,
+        latency_ms=args.latency_ms,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+    )
+    server = create_server(config, port=args.port)
+    print(f"🧪 Serveur Pipedrive local: http://127.0.0.1:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Benchmark de bout en bout du source Pipedrive
+Charge le serveur Pipedrive local dans DuckDB et mesure le débit de chaque étape
+
+Usage: python -m benchmarks.run_benchmark --rows 5000 --max-workers 8
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from urllib.request import urlopen
+
+import dlt
+
+from benchmarks.mock_pipedrive import MockConfig, create_server
+from pipedrive import pipedrive_source
+
+
+def _serve(config, port_queue):
+    server = create_server(config)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def start_mock_server(config):
+    """Démarre le serveur local dans un autre processus pour ne pas fausser les mesures"""
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_serve, args=(config, port_queue), daemon=True
+    )
+    process.start()
+    port = port_queue.get(timeout=30)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def _server_stats(server_url):
+    with urlopen(f"{server_url}/_stats") as response:
+        return json.load(response)
+
+
+def _peak_rss_mb():
+    # ru_maxrss est en kilo-octets sous Linux et en octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_benchmark(api_url, source_kwargs, resources=None, work_dir=None):
+    """Exécute extract, normalize et load séparément et retourne les mesures"""
+    work_dir = work_dir or tempfile.mkdtemp(prefix="pipedrive_benchmark_")
+    pipeline = dlt.pipeline(
+        pipeline_name="pipedrive_benchmark",
+        destination=dlt.destinations.duckdb(os.path.join(work_dir, "benchmark.duckdb")),
+        dataset_name="pipedrive_data",
+        pipelines_dir=os.path.join(work_dir, "pipelines"),
+        dev_mode=True,
+    )
+    source = pipedrive_source(
+        pipedrive_api_key="benchmark", base_url=f"{api_url}/v1", **source_kwargs
+    )
+    if resources:
+        source = source.with_resources(*resources, "custom_fields_mapping")
+
+    stages = {}
+    started_at = time.perf_counter()
+    pipeline.extract(source)
+    stages["extract"] = time.perf_counter() - started_at
+    started_at = time.perf_counter()
+    pipeline.normalize()
+    stages["normalize"] = time.perf_counter() - started_at
+    started_at = time.perf_counter()
+    pipeline.load()
+    stages["load"] = time.perf_counter() - started_at
+
+    row_counts = pipeline.last_trace.last_normalize_info.row_counts
+    rows = sum(
+        count for table, count in row_counts.items() if not table.startswith("_dlt")
+    )
+    total = sum(stages.values())
+    return {
+        "rows": rows,
+        "tables": dict(sorted(row_counts.items())),
+        "stages_seconds": {
+            stage: round(seconds, 3) for stage, seconds in stages.items()
+        },
+        "total_seconds": round(total, 3),
+        "rows_per_second": round(rows / total, 1),
+        "extract_rows_per_second": round(rows / stages["extract"], 1),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Affiche l'écart avec un résultat de référence, retourne False en cas de régression
+
+    Les lignes chargées doivent être identiques à la référence, au total et par table: un mode plus rapide
+    qui perd des lignes est une régression.
+    """
+    ok = True
+    before, after = baseline.get("rows"), result["rows"]
+    if before is not None:
+        mismatch = before != after
+        ok = ok and not mismatch
+        print(f"  {'❌' if mismatch else '✅'} rows: {before} -> {after}")
+    before_tables, after_tables = baseline.get("tables"), result["tables"]
+    if before_tables is not None:
+        for table in sorted(set(before_tables) | set(after_tables)):
+            before, after = before_tables.get(table, 0), after_tables.get(table, 0)
+            if before != after:
+                ok = False
+                print(f"  ❌ {table}: {before} -> {after} lignes")
+    for metric in ("rows_per_second", "extract_rows_per_second", "requests_per_second"):
+        before, after = baseline.get(metric), result.get(metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        regression = change < -tolerance
+        ok = ok and not regression
+        print(
+            f"  {'❌' if regression else '✅'} {metric}: {before} -> {after} ({change:+.1%})"
+        )
+    before, after = baseline.get("peak_rss_mb"), result["peak_rss_mb"]
+    if before:
+        change = (after - before) / before
+        regression = change > tolerance
+        ok = ok and not regression
+        print(
+            f"  {'❌' if regression else '✅'} peak_rss_mb: {before} -> {after} ({change:+.1%})"
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark du source Pipedrive sur un serveur local"
+    )
+    parser.add_argument("--rows", type=int, default=1000, help="Lignes par entité")
+    parser.add_argument(
+        "--custom-fields", type=int, default=50, help="Champs personnalisés par entité"
+    )
+    parser.add_argument(
+        "--enum-options", type=int, default=10, help="Options des champs enum/set"
+    )
+    parser.add_argument(
+        "--flow-entries", type=int, default=5, help="Entrées de flow par deal"
+    )
+    parser.add_argument(
+        "--participants", type=int, default=2, help="Participants par deal"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Latence simulée par requête"
+    )
+    parser.add_argument(
+        "--rate-limit", type=int, default=0, help="Requêtes par fenêtre (0: illimité)"
+    )
+    parser.add_argument(
+        "--rate-window", type=float, default=2.0, help="Durée de la fenêtre en secondes"
+    )
+    parser.add_argument(
+        "--resources", nargs="+", help="Ressources à charger (toutes par défaut)"
+    )
+    parser.add_argument("--max-workers", type=int, default=1)
+    parser.add_argument("--prefetch-pages", type=int, default=0)
+    parser.add_argument("--stream-json", action="store_true")
+    parser.add_argument("--arrow-output", action="store_true")
+    parser.add_argument("--single-scan", action="store_true")
+    parser.add_argument(
+        "--api-url", help="Utiliser un serveur déjà démarré (ex: http://127.0.0.1:8765)"
+    )
+    parser.add_argument("--output", help="Fichier JSON où écrire les résultats")
+    parser.add_argument("--baseline", help="Résultats JSON de référence à comparer")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.1, help="Régression tolérée (0.1 = 10%%)"
+    )
+    args = parser.parse_args()
+
+    config = MockConfig(
+        rows=args.rows,
+        custom_fields=args.custom_fields,
+        enum_options=args.enum_options,
+        flow_entries=args.flow_entries,
+        participants=args.participants,
+        latency_ms=args.latency_ms,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+    )
+    source_kwargs = dict(
+        max_workers=args.max_workers,
+        prefetch_pages=args.prefetch_pages,
+        stream_json=args.stream_json,
+        arrow_output=args.arrow_output,
+        single_scan=args.single_scan,
+    )
+
+    print("🏁 Benchmark Pipedrive -> DuckDB")
+    print("=" * 40)
+    server_process = None
+    api_url = args.api_url
+    if not api_url:
+        server_process, api_url = start_mock_server(config)
+    try:
+        result = run_benchmark(api_url, source_kwargs, args.resources)
+        server_stats = _server_stats(api_url)
+    finally:
+        if server_process:
+            server_process.terminate()
+
+    result["config"] = dict(vars(config), **source_kwargs)
+    result["requests"] = server_stats["requests"]
+    result["throttled"] = server_stats["throttled"]
+    result["mb_received"] = round(server_stats["bytes_sent"] / 1024 / 1024, 2)
+    result["requests_per_second"] = round(
+        server_stats["requests"] / result["total_seconds"], 1
+    )
+
+    for stage, seconds in result["stages_seconds"].items():
+        print(f"⏱️  {stage}: {seconds}s")
+    print(f"📊 {result['rows']} lignes, {result['rows_per_second']} lignes/s")
+    print(
+        f"🌐 {result['requests']} requêtes, {result['requests_per_second']} requêtes/s, {result['throttled']} 429"
+    )
+    print(f"💾 RSS max: {result['peak_rss_mb']} Mo")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"📝 Résultats écrits dans {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print("\n📈 Comparaison avec la référence:")
+        if not compare(result, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -9,6 +9,7 @@ import sys
 import dlt
 from datetime import datetime, timedelta
 from pipedrive import pipedrive_source
+from pipedrive.helpers.metrics import export_metrics
 
 
 def load_incremental_data():
@@ -33,6 +34,10 @@ def load_incremental_data():
     print("✅ Chargement incrémental terminé!")
     print(f"📊 Package chargé: {load_info.load_packages[0].load_id}")
     
+    # Exporter les métriques par endpoint (JSON et textfile Prometheus)
+    json_path, prom_path = export_metrics(os.getenv("PIPEDRIVE_METRICS_DIR", "logs"), pipeline)
+    print(f"📈 Métriques exportées: {json_path}, {prom_path}")
+    
     # Afficher les statistiques
     for table_name, table_info in load_info.load_packages[0].schema_update.items():
         if hasattr(table_info, 'table_name') and hasattr(table_info, 'row_count'):
@@ -1,20 +1,25 @@
 """Pipedrive source helpers"""
 
-from typing import Any, Iterable, Tuple, Dict, List
-from itertools import groupby
-
-
-def _deals_flow_group_key(item: Dict[str, Any]) -> str:
-    return item["object"]  # type: ignore[no-any-return]
+from typing import Any, Dict, Iterable, List, Optional
 
 
 def group_deal_flows(
-    pages: Iterable[Iterable[Dict[str, Any]]]
-) -> Iterable[Tuple[str, List[Dict[str, Any]]]]:
+    pages: Iterable[Iterable[Dict[str, Any]]],
+    groups: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Buckets the data of flow items by object type in a single pass
+
+    The timestamp of each item is set on its data, which is appended to `groups` without a copy,
+    so flows of many deals can be accumulated into the same groups.
+    """
+    if groups is None:
+        groups = {}
     for page in pages:
-        for entity, items in groupby(
-            sorted(page, key=_deals_flow_group_key), key=_deals_flow_group_key
-        ):
-            yield entity, [
-                dict(item["data"], timestamp=item["timestamp"]) for item in items
-            ]
+        for item in page:
+            data = item["data"]
+            data["timestamp"] = item["timestamp"]
+            group = groups.get(item["object"])
+            if group is None:
+                group = groups[item["object"]] = []
+            group.append(data)
+    return groups
@@ -0,0 +1,86 @@
+"""On disk archive of raw pipedrive api pages used to record and replay runs"""
+
+import gzip
+import hashlib
+import os
+from typing import Any, Dict, Iterator, Optional
+
+from dlt.common import json, logger, pendulum
+
+
+class PageArchive:
+    """Stores raw api pages as gzip compressed NDJSON
+
+    Each paginated request is stored in `<archive_dir>/<run_id>/` in a file named after its endpoint and
+    a hash of its params, with one page per line. When `replay` is set pages are read from the archive
+    of `run_id` instead of being requested, so a run can be repeated offline with the same requests.
+    """
+
+    def __init__(
+        self, archive_dir: str, run_id: Optional[str] = None, replay: bool = False
+    ) -> None:
+        if run_id is None:
+            if replay:
+                run_id = _latest_run_id(archive_dir)
+            else:
+                run_id = pendulum.now("UTC").format("YYYYMMDDTHHmmss")
+        self.run_id = run_id
+        self.replay = replay
+        self.run_dir = os.path.join(archive_dir, run_id)
+        if not replay:
+            os.makedirs(self.run_dir, exist_ok=True)
+
+    def read_pages(self, entity: str, params: Dict[str, Any]) -> Iterator[Any]:
+        """Yields the pages recorded for `entity` requested with `params`"""
+        path = self._path(entity, params)
+        if not os.path.exists(path):
+            logger.warning(
+                f"Pipedrive archive run {self.run_id} has no pages for {entity} with params {params}"
+            )
+            return
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                yield json.loadb(line)
+
+    def record_pages(
+        self, entity: str, params: Dict[str, Any], pages: Iterator[Any]
+    ) -> Iterator[Any]:
+        """Writes `pages` of `entity` requested with `params` to the archive while yielding them
+
+        Pages are written to a temporary file that replaces the archived file when pagination ends or the consumer
+        stops early. The temporary file is dropped when requesting a page fails.
+        """
+        path = self._path(entity, params)
+        tmp_path = f"{path}.{os.getpid()}.{id(pages)}.tmp"
+        completed = False
+        try:
+            with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                try:
+                    for page in pages:
+                        f.write(json.dumpb(page) + b"\n")
+                        yield page
+                    completed = True
+                except GeneratorExit:
+                    completed = True
+                    raise
+        finally:
+            if completed:
+                os.replace(tmp_path, path)
+            else:
+                os.remove(tmp_path)
+
+    def _path(self, entity: str, params: Dict[str, Any]) -> str:
+        params_hash = hashlib.sha256(json.dumpb(params, sort_keys=True)).hexdigest()
+        file_name = f"{entity.replace('/', '_')}-{params_hash[:16]}.ndjson.gz"
+        return os.path.join(self.run_dir, file_name)
+
+
+def _latest_run_id(archive_dir: str) -> str:
+    run_ids = sorted(
+        name
+        for name in os.listdir(archive_dir)
+        if os.path.isdir(os.path.join(archive_dir, name))
+    )
+    if not run_ids:
+        raise FileNotFoundError(f"No archived runs found in {archive_dir}")
+    return run_ids[-1]
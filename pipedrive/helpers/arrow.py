@@ -0,0 +1,111 @@
+"""Conversion of pipedrive pages to arrow tables with columnar custom fields rename"""
+
+from itertools import chain
+from typing import Any, Callable, Dict, Optional, Union
+
+from dlt.common import logger
+from dlt.common.libs.pyarrow import pyarrow as pa
+from dlt.common.schema.typing import TColumnSchema, TTableSchemaColumns
+import pyarrow.compute as pc  # type: ignore[import-untyped]
+
+from .custom_fields_munger import RenamePlan
+from ..typing import TDataPage
+
+# arrow types of the column hints of custom fields, decimals take the precision of their hint
+_ARROW_TYPES = {
+    "text": pa.string(),
+    "double": pa.float64(),
+    "bigint": pa.int64(),
+    "date": pa.date32(),
+    "time": pa.time64("us"),
+}
+
+
+def page_to_arrow(
+    data: TDataPage, plan: RenamePlan, columns: Optional[TTableSchemaColumns] = None
+) -> Union[pa.Table, TDataPage]:
+    """Converts a page of rows to an arrow table, renaming custom fields and translating enum and set ids to labels
+
+    The table has a column for every key of any row, rows without a key get nulls. Renamed columns with a hint
+    in `columns` are cast to the type of the hint, so the table matches the schema. Pages whose values cannot be
+    converted to consistent arrow types are renamed and returned as rows.
+    """
+    # `from_pylist` takes the columns of the first row only
+    names = dict.fromkeys(chain.from_iterable(data))
+    try:
+        table = pa.Table.from_pydict(
+            {name: [row.get(name) for row in data] for name in names}
+        )
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as exc:
+        logger.debug(f"Page could not be converted to arrow, yielding rows: {exc}")
+        return plan(data)
+    table = table.rename_columns(
+        [plan.names.get(name, name) for name in table.column_names]
+    )
+    for field_name, options_map in plan.enum_fields:
+        table = _translate_column(table, field_name, options_map, _translate_ids)
+    for field_name, options_map in plan.set_fields:
+        table = _translate_column(table, field_name, options_map, _translate_set)
+    for field_name, hint in (columns or {}).items():
+        table = _cast_column(table, field_name, hint)
+    return table
+
+
+def _translate_column(
+    table: pa.Table,
+    field_name: str,
+    options_map: Dict[Any, str],
+    translate: Callable[[pa.Array, Dict[Any, str]], pa.Array],
+) -> pa.Table:
+    index = table.schema.get_field_index(field_name)
+    if index == -1:
+        return table
+    column = table.column(index)
+    translated = pa.chunked_array(
+        [translate(chunk, options_map) for chunk in column.chunks]
+    )
+    return table.set_column(index, field_name, translated)
+
+
+def _translate_ids(ids: pa.Array, options_map: Dict[Any, str]) -> pa.Array:
+    """Gets the label of each id, ids without a label are kept as strings"""
+    if pa.types.is_integer(ids.type):
+        key_type: type = int
+    elif pa.types.is_string(ids.type):
+        key_type = str
+    else:
+        return ids
+    keys = [key for key in options_map if isinstance(key, key_type)]
+    labels = pa.array([options_map[key] for key in keys], pa.string())
+    positions = pc.index_in(ids, value_set=pa.array(keys, ids.type))
+    return pc.coalesce(labels.take(positions), pc.cast(ids, pa.string()))
+
+
+def _translate_set(column: pa.Array, options_map: Dict[Any, str]) -> pa.Array:
+    # Multiple choice values come either as a list of ids or as comma separated ids
+    if pa.types.is_string(column.type):
+        column = pc.split_pattern(column, ",")
+    if not pa.types.is_list(column.type):
+        return column
+    labels = _translate_ids(column.values, options_map)
+    return pa.ListArray.from_arrays(column.offsets, labels, mask=column.is_null())
+
+
+def _cast_column(table: pa.Table, field_name: str, hint: TColumnSchema) -> pa.Table:
+    index = table.schema.get_field_index(field_name)
+    data_type = hint.get("data_type")
+    if index == -1 or data_type is None:
+        return table
+    if data_type == "decimal":
+        arrow_type = pa.decimal128(hint["precision"], hint["scale"])
+    else:
+        arrow_type = _ARROW_TYPES[data_type]
+    column = table.column(index)
+    if column.type == arrow_type:
+        return table
+    try:
+        return table.set_column(index, field_name, pc.cast(column, arrow_type))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as exc:
+        # the destination coerces columns that arrow cannot cast, e.g. strings to times
+        logger.debug(f"Column {field_name} could not be cast to {arrow_type}: {exc}")
+        return table
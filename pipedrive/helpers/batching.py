@@ -0,0 +1,53 @@
+"""Coalescing of small pages into larger batches of rows"""
+
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from dlt.common import json
+
+DEFAULT_BATCH_MAX_ROWS = 5000
+
+
+def coalesce_pages(
+    pages: Iterable[List[Dict[str, Any]]],
+    max_rows: int = DEFAULT_BATCH_MAX_ROWS,
+    max_bytes: Optional[int] = None,
+    max_seconds: Optional[float] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Buffers the rows of `pages` and yields them in batches
+
+    A batch is yielded once it holds `max_rows` rows, `max_bytes` bytes of rows encoded as json
+    or when its first rows were buffered more than `max_seconds` ago. Buffered rows are yielded when `pages`
+    is exhausted and also when it raises, before the error is re-raised.
+    """
+    batch: List[Dict[str, Any]] = []
+    batch_bytes = 0
+    batch_started_at = 0.0
+    pages = iter(pages)
+    while True:
+        try:
+            page = next(pages)
+        except StopIteration:
+            break
+        except Exception:
+            # rows requested before the error are not lost
+            if batch:
+                yield batch
+            raise
+        if not batch:
+            batch_started_at = time.monotonic()
+        batch.extend(page)
+        if max_bytes:
+            batch_bytes += len(json.dumpb(page))
+        if (
+            len(batch) >= max_rows
+            or (max_bytes and batch_bytes >= max_bytes)
+            or (
+                max_seconds is not None
+                and time.monotonic() - batch_started_at >= max_seconds
+            )
+        ):
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
@@ -0,0 +1,83 @@
+"""Graceful interruption of runs and resumable pagination"""
+
+import signal
+import threading
+from types import FrameType
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from dlt.common import logger
+from dlt.sources.helpers import requests
+
+T = TypeVar("T")
+
+_stop_requested = threading.Event()
+
+
+def request_stop() -> None:
+    """Asks resumable resources to stop requesting pages, so the run ends with the pages extracted so far"""
+    _stop_requested.set()
+
+
+def stop_requested() -> bool:
+    return _stop_requested.is_set()
+
+
+def clear_stop_request() -> None:
+    _stop_requested.clear()
+
+
+def install_sigterm_handler() -> None:
+    """Handles SIGTERM by requesting a stop, a second SIGTERM terminates the process
+
+    Must be called from the main thread.
+    """
+
+    def _handle_sigterm(signum: int, frame: Optional[FrameType]) -> None:
+        if _stop_requested.is_set():
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.raise_signal(signal.SIGTERM)
+        _stop_requested.set()
+
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
+
+def until_stopped(items: Iterator[T]) -> Iterator[T]:
+    """Yields `items` until a stop is requested
+
+    A request that fails is logged and requests a stop, so other resources stop as well and the run ends
+    with what was extracted so far. Other errors are raised.
+    """
+    try:
+        while not _stop_requested.is_set():
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            except requests.RequestException as exc:
+                logger.error(
+                    f"Request failed, stopping the run to resume from the last checkpoint: {exc}"
+                )
+                request_stop()
+                return
+            yield item
+    finally:
+        items.close()  # type: ignore[attr-defined]
+
+
+def checkpointed_pages(
+    pages: Iterator[List[T]],
+    checkpoint: Dict[str, Any],
+    update_time: Callable[[List[T]], Optional[str]],
+) -> Iterator[List[T]]:
+    """Yields `pages` until a stop is requested, keeping the last `update_time` of the pages consumed in `checkpoint`
+
+    `checkpoint` should be a dict in resource state, so it is saved with the pages yielded so far when the run
+    ends. It is cleared when all pages were yielded.
+    """
+    for page in until_stopped(pages):
+        yield page
+        page_update_time = update_time(page)
+        if page_update_time and page_update_time > checkpoint.get("update_time", ""):
+            checkpoint["update_time"] = page_update_time
+    if not _stop_requested.is_set():
+        checkpoint.clear()
@@ -0,0 +1,209 @@
+"""HTTP client shared by all requests sent with one api token"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from dlt.common import json
+from dlt.common.exceptions import MissingDependencyException
+from dlt.sources.helpers import requests
+from requests.adapters import HTTPAdapter
+
+from .archive import PageArchive
+from .memory_budget import MemoryBudget
+from .metrics import record_bytes, record_request
+from .rate_limit import get_rate_limiter
+
+BASE_URL = "https://app.pipedrive.com/v1"
+# a request is given up when it is throttled more times in a row
+MAX_THROTTLED_ATTEMPTS = 10
+# server errors are retried with the exponential backoff of the dlt client, starting at this many seconds
+MAX_SERVER_ERROR_ATTEMPTS = 5
+SERVER_ERROR_BACKOFF = 1.0
+DEFAULT_MAX_CONNECTIONS = 10
+
+
+class PipedriveClient:
+    """Sends requests to the pipedrive api over a pool of keep-alive connections
+
+    The api token, headers and compression are set once on the session. Sessions are created per thread
+    but share the connection pool of the api token, which grows to the largest `max_connections` requested,
+    so it should be sized to the number of threads sending requests. All requests go through the rate
+    limiter of the api token. Paginated requests are recorded to or replayed from `archive` when it is set.
+    Pages requested in the background are accounted in `memory_budget`.
+
+    Each source creates its own client, so sources of one process keep their own url, archive and budget.
+    """
+
+    def __init__(
+        self,
+        pipedrive_api_key: str,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        base_url: str = BASE_URL,
+        archive: Optional[PageArchive] = None,
+        memory_budget: Optional[MemoryBudget] = None,
+    ) -> None:
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.rate_limiter = get_rate_limiter(pipedrive_api_key)
+        self.archive = archive
+        self.memory_budget = memory_budget or MemoryBudget()
+        self._connections = _get_connection_pool(pipedrive_api_key, max_connections)
+
+    def get(
+        self, entity: str, params: Dict[str, Any], stream: bool = False
+    ) -> requests.Response:
+        """Sends a GET request to the `entity` endpoint through the rate limiter
+
+        Throttled requests are sent again once the rate limiter allows it, server errors after an exponential backoff.
+        """
+        url = f"{self.base_url}/{entity}"
+        throttled_attempts = server_error_attempts = 0
+        while True:
+            rate_limit_wait = self.rate_limiter.acquire()
+            started_at = time.perf_counter()
+            try:
+                response = self._connections.session().get(
+                    url, params=params, stream=stream
+                )
+            except Exception:
+                self.rate_limiter.release()
+                raise
+            throttled = self.rate_limiter.update(response) is not None
+            record_request(
+                entity,
+                time.perf_counter() - started_at,
+                rate_limit_wait,
+                throttled=throttled,
+                retry=throttled_attempts + server_error_attempts > 0,
+            )
+            if throttled:
+                throttled_attempts += 1
+                if throttled_attempts < MAX_THROTTLED_ATTEMPTS:
+                    response.close()
+                    continue
+            elif response.status_code >= 500:
+                server_error_attempts += 1
+                if server_error_attempts < MAX_SERVER_ERROR_ATTEMPTS:
+                    response.close()
+                    time.sleep(SERVER_ERROR_BACKOFF * 2 ** (server_error_attempts - 1))
+                    continue
+            break
+        response.raise_for_status()
+        return response
+
+    def get_page(
+        self, entity: str, params: Dict[str, Any], stream_json: bool = False
+    ) -> Dict[str, Any]:
+        """Requests and decodes one page of the `entity` endpoint
+
+        By default the whole body is downloaded and decoded at once with the fastest available json parser.
+        With `stream_json` the body is decoded with `ijson` while it is downloaded, so the raw body is never held in memory.
+        """
+        if not stream_json:
+            response = self.get(entity, params)
+            content = response.content
+            # bytes received over the wire, before decompression
+            record_bytes(entity, response.raw.tell())
+            return json.loadb(content)  # type: ignore[no-any-return]
+        try:
+            import ijson  # type: ignore[import-untyped]
+        except ModuleNotFoundError:
+            raise MissingDependencyException(
+                "Pipedrive source json streaming", ["ijson"]
+            )
+        with self.get(entity, params, stream=True) as response:
+            response.raw.decode_content = True
+            # top level keys are decoded one at a time, `data` is built by the C backend when available
+            page = dict(ijson.kvitems(response.raw, "", use_float=True))
+            record_bytes(entity, response.raw.tell())
+            return page
+
+
+class _ConnectionPool:
+    """Keep-alive connections of an api token, shared by the sessions of all its clients
+
+    Sessions are created per thread by a dlt client, which retries dropped connections. Requests are sent
+    over `adapter`, mounted on each session, so the pool can be inspected.
+    """
+
+    def __init__(self, pipedrive_api_key: str, max_connections: int) -> None:
+        self.max_connections = max_connections
+        self.adapter = HTTPAdapter(pool_maxsize=max_connections)
+        # responses are retried by `PipedriveClient.get`, which records every attempt
+        self._client = requests.Client(
+            raise_for_status=False,
+            status_codes=(),
+            session_attrs={
+                "headers": {
+                    "Content-Type": "application/json",
+                    "Accept-Encoding": "gzip, deflate",
+                },
+                "params": {"api_token": pipedrive_api_key},
+            },
+        )
+
+    def session(self) -> requests.Session:
+        """Returns the session of the current thread"""
+        session = self._client.session
+        if session.adapters.get("https://") is not self.adapter:
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+        return session
+
+    def stats(self) -> Dict[str, int]:
+        """Counts requests that re-used a pooled connection (hits) and that had to open a new one (misses)"""
+        requests_count = connections_count = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            requests_count += pool.num_requests
+            connections_count += pool.num_connections
+        return {
+            "requests": requests_count,
+            "pool_hits": requests_count - connections_count,
+            "pool_misses": connections_count,
+        }
+
+
+_connection_pools: Dict[str, _ConnectionPool] = {}
+_clients: Dict[str, PipedriveClient] = {}
+_clients_lock = threading.Lock()
+
+
+def _get_connection_pool(
+    pipedrive_api_key: str, max_connections: int
+) -> _ConnectionPool:
+    """Returns the connection pool of `pipedrive_api_key`
+
+    A larger pool replaces it when more than its `max_connections` are requested.
+    """
+    with _clients_lock:
+        pool = _connection_pools.get(pipedrive_api_key)
+        if pool is None or max_connections > pool.max_connections:
+            pool = _connection_pools[pipedrive_api_key] = _ConnectionPool(
+                pipedrive_api_key, max_connections
+            )
+        return pool
+
+
+def get_client(pipedrive_api_key: str) -> PipedriveClient:
+    """Returns the default client of `pipedrive_api_key`, used by helpers called without the client of a source"""
+    with _clients_lock:
+        client = _clients.get(pipedrive_api_key)
+    if client is None:
+        client = PipedriveClient(pipedrive_api_key)
+        with _clients_lock:
+            client = _clients.setdefault(pipedrive_api_key, client)
+    return client
+
+
+def pool_stats() -> Dict[str, int]:
+    """Connection pool statistics of all api tokens in this process"""
+    stats = {"requests": 0, "pool_hits": 0, "pool_misses": 0}
+    with _clients_lock:
+        pools = list(_connection_pools.values())
+    for pool in pools:
+        for key, value in pool.stats().items():
+            stats[key] += value
+    return stats
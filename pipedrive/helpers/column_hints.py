@@ -0,0 +1,95 @@
+"""Column hints of custom fields generated from the field types of the *Fields endpoints"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import dlt
+from dlt.common.schema.typing import TColumnSchema, TTableSchemaColumns
+
+from ..typing import TDataPage
+
+# column types of the pipedrive field types, columns of other fields are inferred by dlt from their values
+# set fields are lists of labels loaded to child tables, user, org and people fields may be objects
+FIELD_TYPE_HINTS: Dict[str, TColumnSchema] = {
+    "varchar": {"data_type": "text"},
+    "varchar_auto": {"data_type": "text"},
+    "text": {"data_type": "text"},
+    "phone": {"data_type": "text"},
+    "address": {"data_type": "text"},
+    # enum ids are translated to labels
+    "enum": {"data_type": "text"},
+    "double": {"data_type": "double"},
+    "int": {"data_type": "bigint"},
+    "monetary": {"data_type": "decimal", "precision": 38, "scale": 9},
+    "date": {"data_type": "date"},
+    "daterange": {"data_type": "date"},
+    "time": {"data_type": "time"},
+    "timerange": {"data_type": "time"},
+}
+
+# columns returned next to a field, under its key with a suffix
+COMPANION_COLUMNS: Dict[str, Tuple[Tuple[str, TColumnSchema], ...]] = {
+    "monetary": (("_currency", {"data_type": "text"}),),
+    "daterange": (("_until", {"data_type": "date"}),),
+    "timerange": (("_until", {"data_type": "time"}),),
+}
+
+
+class ColumnHints:
+    """Column hints of the custom fields of one entity, keyed by the column names of renamed pages
+
+    Pipedrive returns empty strings for some empty fields, which would create variant columns of
+    typed fields, so `clean` replaces them with None before pages are renamed.
+    """
+
+    def __init__(
+        self,
+        fields_mapping: Dict[str, Any],
+        keeps: Optional[Callable[[str], bool]] = None,
+    ) -> None:
+        """`keeps` tells which api keys of companion columns are kept in pages, all are kept by default"""
+        self.columns: TTableSchemaColumns = {}
+        self.typed_keys: List[str] = []
+        """Api keys of the fields that are not text"""
+        for hash_string, field in fields_mapping.items():
+            hint = FIELD_TYPE_HINTS.get(field["field_type"])
+            if hint is None:
+                continue
+            columns = [(hash_string, field["name"], hint)] + [
+                (hash_string + suffix, hash_string + suffix, companion_hint)
+                for suffix, companion_hint in COMPANION_COLUMNS.get(
+                    field["field_type"], ()
+                )
+                if keeps is None or keeps(hash_string + suffix)
+            ]
+            for key, name, column_hint in columns:
+                self.columns[name] = {"nullable": True, **column_hint}  # type: ignore[typeddict-item]
+                if column_hint["data_type"] != "text":
+                    self.typed_keys.append(key)
+
+    def clean(self, data: TDataPage) -> TDataPage:
+        typed_keys = self.typed_keys
+        for data_item in data:
+            for key in typed_keys:
+                if data_item.get(key) == "":
+                    data_item[key] = None
+        return data
+
+    def for_table(
+        self, table_name: str
+    ) -> Tuple[TTableSchemaColumns, TTableSchemaColumns]:
+        """Returns the hints of columns that match the schema of `table_name` and of those not in it yet
+
+        Columns created with another type, e.g. inferred by earlier runs, keep it so the destination
+        table is not migrated.
+        """
+        schema = dlt.current.source_schema()
+        existing = schema.tables.get(table_name, {}).get("columns", {})
+        matching: TTableSchemaColumns = {}
+        new: TTableSchemaColumns = {}
+        for name, hint in self.columns.items():
+            column = existing.get(schema.naming.normalize_identifier(name))
+            if column is None or "data_type" not in column:
+                new[name] = matching[name] = hint
+            elif column["data_type"] == hint["data_type"]:
+                matching[name] = hint
+        return matching, new
@@ -1,4 +1,5 @@
-from typing import Any, Dict, TypedDict, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
 
 import dlt
 
@@ -84,19 +85,85 @@ def _normalized_name(name: str) -> str:
 def rename_fields(data: TDataPage, fields_mapping: Dict[str, Any]) -> TDataPage:
     if not fields_mapping:
         return data
-    for data_item in data:
+    return get_rename_plan(fields_mapping)(data)
+
+
+class RenamePlan:
+    """Custom fields mapping of one entity compiled to rename and translate whole pages
+
+    Field names and the enum/set fields to translate are resolved once and option maps are keyed by both
+    int and str ids so values are translated without conversion. Rows are renamed in place.
+    """
+
+    def __init__(self, fields_mapping: Dict[str, Any]) -> None:
+        self.names: Dict[str, str] = {}
+        self.enum_fields: List[Tuple[str, Dict[Any, str]]] = []
+        self.set_fields: List[Tuple[str, Dict[Any, str]]] = []
         for hash_string, field in fields_mapping.items():
-            if hash_string not in data_item:
+            self.names[hash_string] = field["name"]
+            if not field["options"]:
                 continue
-            field_value = data_item.pop(hash_string)
-            field_name = field["name"]
-            options_map = field["options"]
+            if field["field_type"] == "enum":
+                self.enum_fields.append((field["name"], _options_map(field["options"])))
+            elif field["field_type"] == "set":
+                self.set_fields.append((field["name"], _options_map(field["options"])))
+        self.keys = frozenset(self.names)
+
+    def __call__(self, data: TDataPage) -> TDataPage:
+        for data_item in data:
+            if self.keys.isdisjoint(data_item):
+                continue
+            for hash_string, field_name in self.names.items():
+                if hash_string in data_item:
+                    data_item[field_name] = data_item.pop(hash_string)
             # Get label instead of ID for 'enum' and 'set' fields
-            if field_value and field["field_type"] == "set":  # Multiple choice
-                field_value = [
-                    options_map.get(str(enum_id), enum_id) for enum_id in field_value
-                ]
-            elif field_value and field["field_type"] == "enum":
-                field_value = options_map.get(str(field_value), field_value)
-            data_item[field_name] = field_value
-    return data
+            for field_name, options_map in self.enum_fields:
+                field_value = data_item.get(field_name)
+                if field_value:
+                    data_item[field_name] = options_map.get(field_value, field_value)
+            for field_name, options_map in self.set_fields:  # Multiple choice
+                field_value = data_item.get(field_name)
+                if field_value:
+                    if isinstance(field_value, str):
+                        field_value = field_value.split(",")
+                    data_item[field_name] = [
+                        options_map.get(enum_id, enum_id) for enum_id in field_value
+                    ]
+        return data
+
+
+def _options_map(options: Dict[str, str]) -> Dict[Any, str]:
+    options_map: Dict[Any, str] = dict(options)
+    options_map.update(
+        {int(enum_id): label for enum_id, label in options.items() if enum_id.isdigit()}
+    )
+    return options_map
+
+
+# hash string, name, field type and options of each field of a mapping
+TMappingKey = Tuple[Tuple[str, str, str, Tuple[Tuple[str, str], ...]], ...]
+
+
+def get_rename_plan(fields_mapping: Dict[str, Any]) -> RenamePlan:
+    """Returns the compiled plan of `fields_mapping`, shared by mappings with the same content"""
+    return _get_rename_plan(
+        tuple(
+            (
+                hash_string,
+                field["name"],
+                field["field_type"],
+                tuple((field["options"] or {}).items()),
+            )
+            for hash_string, field in fields_mapping.items()
+        )
+    )
+
+
+@lru_cache(maxsize=32)
+def _get_rename_plan(mapping_key: TMappingKey) -> RenamePlan:
+    return RenamePlan(
+        {
+            hash_string: dict(name=name, field_type=field_type, options=dict(options))
+            for hash_string, name, field_type, options in mapping_key
+        }
+    )
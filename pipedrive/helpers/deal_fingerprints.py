@@ -0,0 +1,62 @@
+"""Per-deal fingerprints used to skip flow and participants requests of deals that did not change"""
+
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# deal fields that move when a deal gets new participants, activities or changes stage
+FINGERPRINT_FIELDS = ("participants_count", "last_activity_date", "stage_id")
+# the flow also logs changes of any other field, which only move the update time
+FLOW_FINGERPRINT_FIELDS = FINGERPRINT_FIELDS + ("update_time",)
+
+# fingerprints are stored in resource state as `deal id: [fingerprint, last flow timestamp]`
+TDealFingerprints = Dict[str, List[Any]]
+
+
+def deal_fingerprint(
+    deal: Dict[str, Any], fields: Sequence[str] = FINGERPRINT_FIELDS
+) -> Optional[int]:
+    """Computes a compact fingerprint of the `fields` of a deal, None if the deal lacks one of them"""
+    if any(field not in deal for field in fields):
+        return None
+    values = "|".join(str(deal[field]) for field in fields)
+    return zlib.crc32(values.encode("utf-8"))
+
+
+def get_changed_deals(
+    deals: Iterable[Dict[str, Any]],
+    fingerprints: TDealFingerprints,
+    fields: Sequence[str] = FINGERPRINT_FIELDS,
+) -> List[Tuple[Dict[str, Any], Optional[int]]]:
+    """Returns the deals whose fingerprint differs from the stored one, with their new fingerprint
+
+    Deals without a fingerprint, e.g. because fingerprint fields were excluded, are always returned.
+    """
+    changed_deals = []
+    for deal in deals:
+        fingerprint = deal_fingerprint(deal, fields)
+        stored = fingerprints.get(str(deal["id"]))
+        if fingerprint is None or not stored or stored[0] != fingerprint:
+            changed_deals.append((deal, fingerprint))
+    return changed_deals
+
+
+def get_last_flow_timestamp(
+    fingerprints: TDealFingerprints, deal_id: Any
+) -> Optional[str]:
+    stored = fingerprints.get(str(deal_id))
+    return stored[1] if stored and len(stored) > 1 else None
+
+
+def filter_new_flow_entries(
+    pages: Iterable[List[Dict[str, Any]]], since: Optional[str]
+) -> List[List[Dict[str, Any]]]:
+    """Keeps the flow entries newer than `since`, the flow endpoint has no parameter to filter them"""
+    if since is None:
+        return [page for page in pages]
+    return [
+        new_entries
+        for new_entries in (
+            [entry for entry in page if entry["timestamp"] > since] for page in pages
+        )
+        if new_entries
+    ]
@@ -0,0 +1,66 @@
+"""Process wide cache of the pages of the *Fields endpoints"""
+
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from dlt.common import json
+
+from .client import PipedriveClient, get_client
+from .pages import get_pages
+from ..typing import TDataPage
+
+# seconds during which fields fetched by a source are re-used by other sources of the process
+DEFAULT_FIELDS_CACHE_TTL = 300.0
+
+_fields_pages: Dict[Tuple[str, str, str], Tuple[float, List[TDataPage], str]] = {}
+_fields_pages_lock = threading.Lock()
+
+
+def get_fields_pages(
+    fields_entity: str,
+    pipedrive_api_key: str,
+    ttl: float = DEFAULT_FIELDS_CACHE_TTL,
+    client: Optional[PipedriveClient] = None,
+) -> Tuple[List[TDataPage], str]:
+    """Returns all pages of the `fields_entity` endpoint and a hash of their content
+
+    Pages are cached per api token and api url for `ttl` seconds, so sources created in the same process
+    request each endpoint once. The hash tells whether the fields changed since they were last munged.
+    """
+    client = client or get_client(pipedrive_api_key)
+    cache_key = (pipedrive_api_key, client.base_url, fields_entity)
+    with _fields_pages_lock:
+        cached = _fields_pages.get(cache_key)
+    if cached and time.monotonic() - cached[0] < ttl:
+        return cached[1], cached[2]
+    pages = list(get_pages(fields_entity, pipedrive_api_key, client=client))
+    content_hash = hashlib.sha256(json.dumpb(pages, sort_keys=True)).hexdigest()
+    with _fields_pages_lock:
+        _fields_pages[cache_key] = (time.monotonic(), pages, content_hash[:16])
+    return pages, content_hash[:16]
+
+
+def get_all_fields_pages(
+    fields_entities: Sequence[str],
+    pipedrive_api_key: str,
+    ttl: float = DEFAULT_FIELDS_CACHE_TTL,
+    client: Optional[PipedriveClient] = None,
+) -> List[Tuple[List[TDataPage], str]]:
+    """Fetches the pages of all `fields_entities` concurrently and returns them in the order of `fields_entities`"""
+    if len(fields_entities) <= 1:
+        return [
+            get_fields_pages(fields_entity, pipedrive_api_key, ttl, client)
+            for fields_entity in fields_entities
+        ]
+    with ThreadPoolExecutor(max_workers=len(fields_entities)) as executor:
+        return list(
+            executor.map(
+                lambda fields_entity: get_fields_pages(
+                    fields_entity, pipedrive_api_key, ttl, client
+                ),
+                fields_entities,
+            )
+        )
@@ -0,0 +1,175 @@
+"""Budget of the pages decoded ahead of their consumers, shared by all producers of a source"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dlt.common import json
+
+# pages, rows and bytes held by a lease
+TUsage = Tuple[int, int, int]
+
+_high_water = {"pages": 0, "rows": 0, "bytes": 0}
+_high_water_lock = threading.Lock()
+
+
+class MemoryBudget:
+    """Limits the pages that background requests hold before they are consumed, in pages, rows or bytes
+
+    Each producer (a read ahead thread or a pool of concurrent requests) takes a `lease`, reserves room for a page
+    before requesting it and releases it once the consumer took the page. A lease always keeps room for one page:
+    the extracting thread could be waiting for its producer, which must then be able to deliver without waiting
+    for pages of other producers. `lease` therefore returns None when the budget has no room left for another
+    producer, whose consumer then requests its pages itself, and further pages of a lease wait for room.
+
+    Room for a page not requested yet is the largest page measured so far, so while no page was measured
+    rows and bytes limits grant a single lease. Larger pages than that and the first page, when larger
+    than the budget, exceed it. Bytes are measured as json and only when `max_bytes` is set. Without limits
+    usage is only tracked, so the high-water mark can be reported.
+    """
+
+    def __init__(
+        self,
+        max_pages: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self.max_pages = max_pages
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.pages = self.rows = self.bytes = 0
+        self.leases = 0
+        self.wait_time = 0.0
+        """Total seconds producers were blocked by the budget"""
+        self._page_size: TUsage = (1, 0, 0)
+        """Room reserved for a page not requested yet, the largest page measured so far"""
+        self._measured = False
+        self._condition = threading.Condition()
+
+    def lease(self) -> Optional["Lease"]:
+        """Reserves room for the first page of a new producer, returns None if the budget has none left"""
+        with self._condition:
+            if self.leases and (
+                self._exceeds(self._page_size)
+                or (not self._measured and (self.max_rows or self.max_bytes))
+            ):
+                return None
+            self.leases += 1
+            return Lease(self, self._reserve(self._page_size))
+
+    def measure(self, pages: List[List[Any]]) -> TUsage:
+        size = sum(len(json.dumpb(page)) for page in pages) if self.max_bytes else 0
+        return len(pages), sum(len(page) for page in pages), size
+
+    def _exceeds(self, usage: TUsage) -> bool:
+        """Tells if holding `usage` more would exceed a limit"""
+        return bool(
+            (self.max_pages and self.pages + usage[0] > self.max_pages)
+            or (self.max_rows and self.rows + usage[1] > self.max_rows)
+            or (self.max_bytes and self.bytes + usage[2] > self.max_bytes)
+        )
+
+    def _reserve(self, usage: TUsage) -> TUsage:
+        self.pages += usage[0]
+        self.rows += usage[1]
+        self.bytes += usage[2]
+        _update_high_water(self.pages, self.rows, self.bytes)
+        return usage
+
+    def _unreserve(self, usage: TUsage) -> None:
+        self.pages -= usage[0]
+        self.rows -= usage[1]
+        self.bytes -= usage[2]
+        self._condition.notify_all()
+
+
+class Lease:
+    """Pages held by one producer of a `MemoryBudget`, with room for one page reserved while it holds none"""
+
+    def __init__(self, budget: MemoryBudget, spare: TUsage) -> None:
+        self.budget = budget
+        self.pages = 0
+        """Pages, or items of a pool, reserved or held"""
+        self._spare: Optional[TUsage] = spare
+
+    def reserve(self) -> TUsage:
+        """Reserves room for a page before it is requested, waiting while the budget has none left
+
+        Room is always left for a lease that holds no page. Returns the reserved usage to pass to `fill`
+        or `release`.
+        """
+        budget = self.budget
+        with budget._condition:
+            if self._spare is None and budget._exceeds(budget._page_size):
+                started_at = time.monotonic()
+                while self._spare is None and budget._exceeds(budget._page_size):
+                    budget._condition.wait()
+                budget.wait_time += time.monotonic() - started_at
+            return self._reserve()
+
+    def try_reserve(self) -> Optional[TUsage]:
+        """Like `reserve` but returns None instead of waiting"""
+        budget = self.budget
+        with budget._condition:
+            if self._spare is None and budget._exceeds(budget._page_size):
+                return None
+            return self._reserve()
+
+    def _reserve(self) -> TUsage:
+        self.pages += 1
+        if self._spare is not None:
+            usage, self._spare = self._spare, None
+            return usage
+        return self.budget._reserve(self.budget._page_size)
+
+    def fill(self, reserved: TUsage, pages: List[List[Any]]) -> TUsage:
+        """Replaces the room `reserved` for `pages` with their measure, returns the usage to pass to `release`"""
+        budget = self.budget
+        usage = budget.measure(pages)
+        with budget._condition:
+            budget._unreserve(reserved)
+            budget._reserve(usage)
+            # an item of a pool may return several pages, their room was reserved as for one
+            budget._page_size = (
+                1,
+                max(budget._page_size[1], usage[1] // max(usage[0], 1)),
+                max(budget._page_size[2], usage[2] // max(usage[0], 1)),
+            )
+            budget._measured = budget._measured or bool(usage[0])
+        return usage
+
+    def release(self, usage: TUsage) -> None:
+        budget = self.budget
+        with budget._condition:
+            budget._unreserve(usage)
+            self.pages -= 1
+            if not self.pages and self._spare is None:
+                self._spare = budget._reserve(budget._page_size)
+
+    def close(self) -> None:
+        """Gives back the room of the lease, once all its pages are released"""
+        budget = self.budget
+        with budget._condition:
+            if self._spare is not None:
+                budget._unreserve(self._spare)
+                self._spare = None
+            budget.leases -= 1
+            budget._condition.notify_all()
+
+
+def _update_high_water(pages: int, rows: int, size: int) -> None:
+    with _high_water_lock:
+        _high_water["pages"] = max(_high_water["pages"], pages)
+        _high_water["rows"] = max(_high_water["rows"], rows)
+        _high_water["bytes"] = max(_high_water["bytes"], size)
+
+
+def reset_memory_high_water() -> None:
+    with _high_water_lock:
+        _high_water.update(pages=0, rows=0, bytes=0)
+
+
+def memory_high_water() -> Dict[str, int]:
+    """Most pages, rows and bytes held at once by the budgets of this process"""
+    with _high_water_lock:
+        return dict(_high_water)
@@ -0,0 +1,253 @@
+"""Metrics of the requests sent to Pipedrive and of the hot paths of the source
+
+Metrics are collected for the whole process, reset when a source is created and exported after a run
+as json and as a Prometheus textfile.
+"""
+
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dlt.common import json
+
+from .memory_budget import memory_high_water, reset_memory_high_water
+from dlt import Pipeline
+
+# upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class EndpointMetrics:
+    """Counters of the requests sent to one endpoint"""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.retries = 0
+        """Requests sent again after a 429 response or a server error"""
+        self.throttled = 0
+        """Number of 429 responses received"""
+        self.bytes_received = 0
+        self.rate_limit_wait = 0.0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        """Requests per latency bucket, the last bucket counts requests slower than all bounds"""
+
+    def observe_latency(self, seconds: float) -> None:
+        self.latency_sum += seconds
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.latency_buckets[index] += 1
+                return
+        self.latency_buckets[-1] += 1
+
+    def asdict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "bytes_received": self.bytes_received,
+            "rate_limit_wait": round(self.rate_limit_wait, 6),
+            "latency_sum": round(self.latency_sum, 6),
+            "latency_buckets": dict(
+                zip(
+                    [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"],
+                    self.latency_buckets,
+                )
+            ),
+        }
+
+
+_endpoints: Dict[str, EndpointMetrics] = {}
+# calls and total seconds of each timed step
+_timings: Dict[str, List[float]] = {}
+_metrics_lock = threading.Lock()
+
+
+def endpoint_name(entity: str) -> str:
+    """Returns the endpoint of `entity` with ids replaced, so requests for different records are counted together"""
+    return re.sub(r"(?<=/)\d+(?=/|$)", "{id}", entity)
+
+
+def record_request(
+    entity: str,
+    latency: float,
+    rate_limit_wait: float = 0.0,
+    throttled: bool = False,
+    retry: bool = False,
+) -> None:
+    with _metrics_lock:
+        metrics = _endpoint_metrics(entity)
+        metrics.requests += 1
+        metrics.retries += retry
+        metrics.throttled += throttled
+        metrics.rate_limit_wait += rate_limit_wait
+        metrics.observe_latency(latency)
+
+
+def record_bytes(entity: str, bytes_received: int) -> None:
+    with _metrics_lock:
+        _endpoint_metrics(entity).bytes_received += bytes_received
+
+
+@contextmanager
+def timed(step: str) -> Iterator[None]:
+    """Adds the time spent in the block to the total of `step`"""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started_at
+        with _metrics_lock:
+            timing = _timings.get(step)
+            if timing is None:
+                timing = _timings[step] = [0, 0.0]
+            timing[0] += 1
+            timing[1] += elapsed
+
+
+def reset_metrics() -> None:
+    """Clears the metrics collected so far, each source starts its run with empty metrics"""
+    with _metrics_lock:
+        _endpoints.clear()
+        _timings.clear()
+    reset_memory_high_water()
+
+
+def get_metrics(pipeline: Optional[Pipeline] = None) -> Dict[str, Any]:
+    """Returns the metrics collected so far
+
+    Rows yielded per resource are taken from the last extraction of `pipeline`, which dlt counts itself.
+    """
+    with _metrics_lock:
+        metrics: Dict[str, Any] = {
+            "endpoints": {
+                endpoint: endpoint_metrics.asdict()
+                for endpoint, endpoint_metrics in sorted(_endpoints.items())
+            },
+            "timings": {
+                step: {"calls": int(calls), "seconds": round(seconds, 6)}
+                for step, (calls, seconds) in sorted(_timings.items())
+            },
+        }
+    metrics["resources"] = _resource_rows(pipeline) if pipeline else {}
+    metrics["buffered_high_water"] = memory_high_water()
+    return metrics
+
+
+def export_metrics(
+    directory: str, pipeline: Optional[Pipeline] = None
+) -> Tuple[str, str]:
+    """Writes the metrics to `metrics.json` and to the `pipedrive.prom` Prometheus textfile in `directory`
+
+    Files are replaced atomically so a collector never reads a partial file. Returns the paths of both files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    metrics = get_metrics(pipeline)
+    json_path = os.path.join(directory, "metrics.json")
+    prom_path = os.path.join(directory, "pipedrive.prom")
+    _write_atomically(json_path, json.dumps(metrics, pretty=True))
+    _write_atomically(prom_path, _to_prometheus(metrics))
+    return json_path, prom_path
+
+
+def _endpoint_metrics(entity: str) -> EndpointMetrics:
+    endpoint = endpoint_name(entity)
+    metrics = _endpoints.get(endpoint)
+    if metrics is None:
+        metrics = _endpoints[endpoint] = EndpointMetrics()
+    return metrics
+
+
+def _resource_rows(pipeline: Pipeline) -> Dict[str, int]:
+    trace = pipeline.last_trace
+    extract_info = trace.last_extract_info if trace else None
+    rows: Dict[str, int] = {}
+    if extract_info is None:
+        return rows
+    for load_metrics in extract_info.metrics.values():
+        for step_metrics in load_metrics:
+            for resource, resource_metrics in step_metrics["resource_metrics"].items():
+                rows[resource] = rows.get(resource, 0) + resource_metrics.items_count
+    return rows
+
+
+_PROMETHEUS_COUNTERS = (
+    ("requests", "pipedrive_requests_total", "Requests sent to the Pipedrive api"),
+    (
+        "retries",
+        "pipedrive_retries_total",
+        "Requests sent again after a 429 response or a server error",
+    ),
+    ("throttled", "pipedrive_throttled_total", "429 responses received"),
+    (
+        "bytes_received",
+        "pipedrive_received_bytes_total",
+        "Bytes of response bodies received",
+    ),
+    (
+        "rate_limit_wait",
+        "pipedrive_rate_limit_wait_seconds_total",
+        "Seconds requests waited for the rate limiter",
+    ),
+)
+
+
+def _to_prometheus(metrics: Dict[str, Any]) -> str:
+    lines = []
+    endpoints = metrics["endpoints"]
+    for key, name, help_text in _PROMETHEUS_COUNTERS:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for endpoint, endpoint_metrics in endpoints.items():
+            lines.append(f'{name}{{endpoint="{endpoint}"}} {endpoint_metrics[key]}')
+    name = "pipedrive_request_duration_seconds"
+    lines += [
+        f"# HELP {name} Latency of requests to the Pipedrive api",
+        f"# TYPE {name} histogram",
+    ]
+    for endpoint, endpoint_metrics in endpoints.items():
+        cumulative = 0
+        for bound, count in endpoint_metrics["latency_buckets"].items():
+            cumulative += count
+            lines.append(
+                f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}'
+            )
+        lines.append(
+            f'{name}_sum{{endpoint="{endpoint}"}} {endpoint_metrics["latency_sum"]}'
+        )
+        lines.append(f'{name}_count{{endpoint="{endpoint}"}} {cumulative}')
+    for key, name, help_text in (
+        ("calls", "pipedrive_step_calls_total", "Calls of timed steps of the source"),
+        (
+            "seconds",
+            "pipedrive_step_seconds_total",
+            "Seconds spent in timed steps of the source",
+        ),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for step, timing in metrics["timings"].items():
+            lines.append(f'{name}{{step="{step}"}} {timing[key]}')
+    name = "pipedrive_resource_rows_total"
+    lines += [
+        f"# HELP {name} Rows yielded by resources in the last run",
+        f"# TYPE {name} counter",
+    ]
+    for resource, rows in metrics["resources"].items():
+        lines.append(f'{name}{{resource="{resource}"}} {rows}')
+    name = "pipedrive_buffered_high_water"
+    lines += [
+        f"# HELP {name} Most pages, rows and bytes held at once by background requests",
+        f"# TYPE {name} gauge",
+    ]
+    for unit, value in metrics["buffered_high_water"].items():
+        lines.append(f'{name}{{unit="{unit}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomically(path: str, content: str) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(temp_path, path)
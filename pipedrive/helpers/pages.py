@@ -1,23 +1,55 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from itertools import chain
+from queue import Empty, Full, Queue
 from typing import (
     Any,
+    Callable,
+    Deque,
     Dict,
     Iterable,
     Iterator,
     List,
+    Optional,
+    Sequence,
+    Tuple,
     TypeVar,
     Union,
 )
 
 import dlt
-from dlt.sources.helpers import requests
+from dlt.common import pendulum
+from dlt.common.schema.typing import TTableSchemaColumns
+from dlt.common.time import ensure_pendulum_datetime
+from dlt.common.typing import TDataItems
+from dlt.extract.items import DataItemWithMeta
 
-from .custom_fields_munger import rename_fields
+from .checkpoint import checkpointed_pages, until_stopped
+from .client import PipedriveClient, get_client
+from .column_hints import ColumnHints
+from .custom_fields_munger import RenamePlan, get_rename_plan
+from .memory_budget import MemoryBudget, TUsage
+from .metrics import timed
+from .projection import REQUIRED_FIELDS, FieldProjection
 from ..typing import TDataPage
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# largest page limit accepted by the api
+MAX_PAGE_SIZE = 500
+
 
 def get_pages(
-    entity: str, pipedrive_api_key: str, extra_params: Dict[str, Any] = None
+    entity: str,
+    pipedrive_api_key: str,
+    extra_params: Optional[Dict[str, Any]] = None,
+    prefetch_pages: int = 0,
+    stream_json: bool = False,
+    first_page_size: Optional[int] = None,
+    client: Optional[PipedriveClient] = None,
 ) -> Iterator[List[Dict[str, Any]]]:
     """
     Generic method to retrieve endpoint data based on the required headers and params.
@@ -26,16 +58,67 @@ def get_pages(
         entity: the endpoint you want to call
         pipedrive_api_key:
         extra_params: any needed request params except pagination.
+        prefetch_pages: number of pages requested in the background ahead of the consumer. 0 requests a page only when asked for.
+        stream_json: decode pages while they are downloaded instead of loading the whole body first. Requires `ijson`.
+        first_page_size: limit of the first page, doubled on each following page up to the largest limit.
+            Cheaper when the consumer usually stops after a few items.
+        client: client of the source sending the requests, the default client of the api token if not given.
 
     Returns:
 
     """
-    headers = {"Content-Type": "application/json"}
-    params = {"api_token": pipedrive_api_key}
-    if extra_params:
-        params.update(extra_params)
-    url = f"https://app.pipedrive.com/v1/{entity}"
-    yield from _paginated_get(url, headers=headers, params=params)
+    params = dict(extra_params or {})
+    client = client or get_client(pipedrive_api_key)
+    yield from _read_ahead(
+        _paginated_get(
+            client,
+            entity,
+            params=params,
+            stream_json=stream_json,
+            first_page_size=first_page_size,
+        ),
+        prefetch_pages,
+        client.memory_budget,
+    )
+
+
+def get_pages_concurrently(
+    entities: Sequence[str],
+    pipedrive_api_key: str,
+    max_workers: int = 1,
+    extra_params: Optional[Dict[str, Any]] = None,
+    client: Optional[PipedriveClient] = None,
+) -> Iterator[Iterable[List[Dict[str, Any]]]]:
+    """
+    Retrieves all pages of every endpoint in `entities`, requesting up to `max_workers` endpoints at a time.
+
+    Pages are grouped per endpoint and groups are yielded in the order of `entities`,
+    so callers can match each group with the item it was requested for.
+    With `max_workers` <= 1 endpoints are requested lazily one after another.
+    """
+    client = client or get_client(pipedrive_api_key)
+    if max_workers <= 1:
+        for entity in entities:
+            yield get_pages(
+                entity, pipedrive_api_key, extra_params=extra_params, client=client
+            )
+        return
+
+    def _get_all_pages(entity: str) -> List[List[Dict[str, Any]]]:
+        return list(
+            get_pages(
+                entity, pipedrive_api_key, extra_params=extra_params, client=client
+            )
+        )
+
+    # at most `max_workers` endpoints are requested ahead of the consumer, pending requests are cancelled
+    # if the consumer stops early
+    yield from _map_in_order(
+        _get_all_pages,
+        entities,
+        max_workers,
+        client.memory_budget,
+    )
 
 
 def get_recent_items_incremental(
@@ -44,36 +127,368 @@ def get_recent_items_incremental(
     since_timestamp: dlt.sources.incremental[str] = dlt.sources.incremental(
         "update_time|modified", "1970-01-01 00:00:00"
     ),
+    prefetch_pages: int = 0,
+    stream_json: bool = False,
+    arrow_output: bool = False,
+    resumable: bool = False,
+    include_fields: Optional[Sequence[str]] = None,
+    exclude_fields: Optional[Sequence[str]] = None,
+    arrow_set_fields_as_lists: bool = False,
+    client: Optional[PipedriveClient] = None,
 ) -> Iterator[TDataPage]:
     """Get a specific entity type from /recents with incremental state."""
-    yield from _get_recent_pages(entity, pipedrive_api_key, since_timestamp.last_value)
+    yield from _get_recent_pages(
+        entity,
+        pipedrive_api_key,
+        since_timestamp.last_value,
+        prefetch_pages,
+        stream_json,
+        arrow_output,
+        resumable,
+        include_fields,
+        exclude_fields,
+        arrow_set_fields_as_lists,
+        client,
+    )
+
+
+def get_recent_items_backfill(
+    entity: str,
+    pipedrive_api_key: str,
+    since_timestamp: dlt.sources.incremental[str] = dlt.sources.incremental(
+        "update_time|modified", "1970-01-01 00:00:00"
+    ),
+    window_days: int = 30,
+    max_workers: int = 1,
+    max_windows: int = 0,
+    stream_json: bool = False,
+    arrow_output: bool = False,
+    resumable: bool = False,
+    include_fields: Optional[Sequence[str]] = None,
+    exclude_fields: Optional[Sequence[str]] = None,
+    arrow_set_fields_as_lists: bool = False,
+    client: Optional[PipedriveClient] = None,
+) -> Iterator[TDataPage]:
+    """Get a specific entity type from /recents in time windows requested in parallel, with incremental state.
+
+    Args:
+        window_days: length of the windows in which the history from the incremental cursor to now is split.
+        max_workers: number of windows requested at a time. Windows are yielded in order.
+        max_windows: number of windows after which the run stops, the next run continues from there. 0 requests all windows.
+
+    The end of the last window yielded in full is kept in the resource state, so the next run starts after completed
+    windows even when they had no items. The last window is open ended. The number of windows left for the next runs
+    is kept in the state as `backfill_remaining_windows`.
+    """
+    client = client or get_client(pipedrive_api_key)
+    state = dlt.current.resource_state()
+    start = max(since_timestamp.last_value, state.get("backfill_completed_until", ""))
+    windows = _time_windows(start, window_days)
+    if len(windows) > 1:
+        # windows start at the first item so years without items cost no requests
+        first_update_time = _get_first_update_time(
+            entity, pipedrive_api_key, start, client
+        )
+        windows = (
+            _time_windows(first_update_time, window_days)
+            if first_update_time
+            else [(start, None)]
+        )
+    state["backfill_remaining_windows"] = (
+        max(len(windows) - max_windows, 0) if max_windows else 0
+    )
+    if max_windows:
+        windows = windows[:max_windows]
+
+    def _get_window(window: Tuple[str, Optional[str]]) -> List[List[Dict[str, Any]]]:
+        return _get_recent_window_pages(
+            entity, pipedrive_api_key, window[0], window[1], stream_json, client
+        )
+
+    windows_pages = _map_in_order(
+        _get_window, windows, max_workers, client.memory_budget
+    )
+    if resumable:
+        # completed windows are the checkpoints
+        windows_pages = until_stopped(windows_pages)
+    for (_, window_end), pages in zip(windows, windows_pages):
+        yield from _rename_pages(
+            pages,
+            entity,
+            arrow_output,
+            include_fields,
+            exclude_fields,
+            arrow_set_fields_as_lists,
+        )
+        if window_end is not None:
+            state["backfill_completed_until"] = window_end
+
+
+def get_all_recent_items(
+    pipedrive_api_key: str,
+    entities: Dict[str, str],
+    since_timestamp: str = "1970-01-01 00:00:00",
+    prefetch_pages: int = 0,
+    stream_json: bool = False,
+    resumable: bool = False,
+    client: Optional[PipedriveClient] = None,
+) -> Iterator[Any]:
+    """Pages through /recents once for every entity of `entities` whose resource is selected.
+
+    Args:
+        entities: entity types mapped to the name of the resource that loads them.
+        since_timestamp: timestamp from which an entity is requested when it was never scanned before.
+
+    The last update time of each entity is kept in the resource state. An entity scanned for the first time starts
+    from the incremental cursor its resource kept in the other modes, so switching a pipeline to the single scan does
+    not reload it. The scan starts from the oldest of them and the items of each entity are filtered against its own
+    last update time, read once when the scan starts. Items of each entity are yielded as a list marked with the name
+    of its resource with `dlt.mark.with_table_name`.
+    """
+    selected_resources = dlt.current.source().selected_resources
+    scanned = [
+        entity
+        for entity, resource_name in entities.items()
+        if resource_name in selected_resources
+    ]
+    if not scanned:
+        return
+    state = dlt.current.resource_state()
+    last_values: Dict[str, str] = state.setdefault("last_values", {})
+    # items updated at the last value may not all have been loaded, merge deduplicates the ones that were
+    start_values = {
+        entity: last_values.get(entity)
+        or _incremental_last_value(entities[entity])
+        or since_timestamp
+        for entity in scanned
+    }
+    params = dict(
+        since_timestamp=min(start_values.values()),
+        items=",".join(scanned),
+    )
+    if resumable:
+        checkpoint = state.setdefault("checkpoint", {})
+        params = _resume_from_checkpoint(checkpoint, params)
+    pages = get_pages(
+        "recents",
+        pipedrive_api_key,
+        extra_params=params,
+        prefetch_pages=prefetch_pages,
+        stream_json=stream_json,
+        client=client,
+    )
+    if resumable:
+        pages = checkpointed_pages(pages, checkpoint, _recents_update_time)
+    for page in pages:
+        entities_data: Dict[str, List[Dict[str, Any]]] = {}
+        for item in page:
+            entity = item["item"]
+            start_value = start_values.get(entity)
+            if start_value is None:
+                continue
+            for data_item in _list_wrapped(item["data"]):
+                if data_item is None:
+                    continue
+                update_time = _update_time(data_item)
+                if update_time and update_time < start_value:
+                    continue
+                if update_time and update_time > last_values.get(entity, ""):
+                    last_values[entity] = update_time
+                entities_data.setdefault(entity, []).append(data_item)
+        for entity, data in entities_data.items():
+            yield dlt.mark.with_table_name(data, entities[entity])
+
+
+def get_entity_recent_items(
+    data: List[Dict[str, Any]],
+    entity: str,
+    arrow_output: bool = False,
+    include_fields: Optional[Sequence[str]] = None,
+    exclude_fields: Optional[Sequence[str]] = None,
+    arrow_set_fields_as_lists: bool = False,
+    meta: Any = None,
+) -> Iterator[TDataItems]:
+    """Renames the items of `get_all_recent_items` routed to this resource, items of other resources are skipped."""
+    if getattr(meta, "table_name", None) != dlt.current.resource_name():
+        return
+    for page in _rename_pages(
+        [data],
+        entity,
+        arrow_output,
+        include_fields,
+        exclude_fields,
+        arrow_set_fields_as_lists,
+    ):
+        # dlt passes the meta of the scan on to the transformers of this resource, which would route their
+        # items to this table
+        yield (
+            page if isinstance(page, DataItemWithMeta) else DataItemWithMeta(None, page)
+        )
+
+
+def _incremental_last_value(resource_name: str) -> Optional[str]:
+    """Most recent last value of the incremental cursors of `resource_name`, None if it has none"""
+    resource_state = (
+        dlt.current.source_state().get("resources", {}).get(resource_name, {})
+    )
+    return max(
+        (
+            cursor["last_value"]
+            for cursor in resource_state.get("incremental", {}).values()
+            if cursor.get("last_value")
+        ),
+        default=None,
+    )
 
 
 def _paginated_get(
-    url: str, headers: Dict[str, Any], params: Dict[str, Any]
+    client: PipedriveClient,
+    entity: str,
+    params: Dict[str, Any],
+    stream_json: bool = False,
+    first_page_size: Optional[int] = None,
 ) -> Iterator[List[Dict[str, Any]]]:
     """
     Requests and yields data 500 records at a time
     Documentation: https://pipedrive.readme.io/docs/core-api-concepts-pagination
     """
-    # pagination start and page limit
-    params["start"] = 0
-    params["limit"] = 500
-    while True:
-        page = requests.get(url, headers=headers, params=params).json()
+    archive = client.archive
+    # smaller pages are archived apart from complete ones
+    archive_params = dict(params)
+    if first_page_size:
+        archive_params["first_page_size"] = first_page_size
+    if archive is not None and archive.replay:
+        pages = archive.read_pages(entity, archive_params)
+    else:
+        pages = _request_pages(
+            client, entity, dict(params), stream_json, first_page_size
+        )
+        if archive is not None:
+            pages = archive.record_pages(entity, archive_params, pages)
+    for page in pages:
         # yield data only
         data = page["data"]
         if data:
             yield data
+
+
+def _request_pages(
+    client: PipedriveClient,
+    entity: str,
+    params: Dict[str, Any],
+    stream_json: bool = False,
+    first_page_size: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Requests and yields whole pages of `entity` until the last one"""
+    # pagination start and page limit
+    params["start"] = 0
+    params["limit"] = min(first_page_size or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+    while True:
+        page = client.get_page(entity, params=params, stream_json=stream_json)
+        yield page
         # check if next page exists
         pagination_info = page.get("additional_data", {}).get("pagination", {})
         # is_next_page is set to True or False
         if not pagination_info.get("more_items_in_collection", False):
             break
         params["start"] = pagination_info.get("next_start")
+        params["limit"] = min(params["limit"] * 2, MAX_PAGE_SIZE)
 
 
-T = TypeVar("T")
+class _ReadAheadError:
+    def __init__(self, exception: BaseException) -> None:
+        self.exception = exception
+
+
+_READ_AHEAD_DONE = object()
+
+
+def _read_ahead(
+    pages: Iterator[List[T]], depth: int, budget: Optional[MemoryBudget] = None
+) -> Iterator[List[T]]:
+    """Consumes `pages` in a background thread, keeping up to `depth` pages ready ahead of the consumer
+
+    Errors of the background thread are re-raised in the consumer. When the consumer stops early
+    the background thread finishes the request in progress and drops its result.
+    Pages ready ahead are accounted in `budget` until the consumer takes the next one, the background thread
+    reserves room for a page before requesting it and waits while the budget has none. When the budget has
+    no room left for another producer the pages are requested by the consumer, without reading ahead.
+    """
+    if depth <= 0:
+        yield from pages
+        return
+    lease = (budget or MemoryBudget()).lease()
+    if lease is None:
+        yield from pages
+        return
+
+    buffer: "Queue[Any]" = Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def _release_buffered() -> None:
+        while True:
+            try:
+                item = buffer.get_nowait()
+            except Empty:
+                return
+            if isinstance(item, tuple):
+                lease.release(item[1])
+
+    def _put(item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _produce() -> None:
+        try:
+            while True:
+                reserved = lease.reserve()
+                try:
+                    page = None if stopped.is_set() else next(pages, None)
+                except BaseException:
+                    lease.release(reserved)
+                    raise
+                if page is None:
+                    lease.release(reserved)
+                    break
+                usage = lease.fill(reserved, [page])
+                if not _put((page, usage)):
+                    lease.release(usage)
+                    return
+        except BaseException as exc:
+            _put(_ReadAheadError(exc))
+        else:
+            _put(_READ_AHEAD_DONE)
+        finally:
+            pages.close()  # type: ignore[attr-defined]
+
+    producer = threading.Thread(
+        target=_produce, name="pipedrive_read_ahead", daemon=True
+    )
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _READ_AHEAD_DONE:
+                return
+            if isinstance(item, _ReadAheadError):
+                raise item.exception
+            page, usage = item
+            try:
+                yield page
+            finally:
+                lease.release(usage)
+    finally:
+        stopped.set()
+        # wakes up the background thread if it waits for the budget
+        _release_buffered()
+        producer.join()
+        _release_buffered()
+        lease.close()
 
 
 def _extract_recents_data(data: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -97,19 +512,263 @@ def _list_wrapped(item: Union[List[T], T]) -> List[T]:
 
 
 def _get_recent_pages(
-    entity: str, pipedrive_api_key: str, since_timestamp: str
+    entity: str,
+    pipedrive_api_key: str,
+    since_timestamp: str,
+    prefetch_pages: int = 0,
+    stream_json: bool = False,
+    arrow_output: bool = False,
+    resumable: bool = False,
+    include_fields: Optional[Sequence[str]] = None,
+    exclude_fields: Optional[Sequence[str]] = None,
+    arrow_set_fields_as_lists: bool = False,
+    client: Optional[PipedriveClient] = None,
 ) -> Iterator[TDataPage]:
-    custom_fields_mapping = (
-        dlt.current.source_state().get("custom_fields_mapping", {}).get(entity, {})
+    params = dict(since_timestamp=since_timestamp, items=entity)
+    if not resumable:
+        pages = get_pages(
+            "recents",
+            pipedrive_api_key,
+            extra_params=params,
+            prefetch_pages=prefetch_pages,
+            stream_json=stream_json,
+            client=client,
+        )
+    else:
+        checkpoint = dlt.current.resource_state().setdefault("checkpoint", {})
+        params = _resume_from_checkpoint(checkpoint, params)
+        pages = checkpointed_pages(
+            get_pages(
+                "recents",
+                pipedrive_api_key,
+                extra_params=params,
+                prefetch_pages=prefetch_pages,
+                stream_json=stream_json,
+                client=client,
+            ),
+            checkpoint,
+            _recents_update_time,
+        )
+    yield from _rename_pages(
+        (_extract_recents_data(page) for page in pages),
+        entity,
+        arrow_output,
+        include_fields,
+        exclude_fields,
+        arrow_set_fields_as_lists,
     )
+
+
+def _resume_from_checkpoint(
+    checkpoint: Dict[str, Any], params: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Returns the params of a /recents scan of the same items resumed where the scan of the last run was interrupted
+
+    /recents is ordered by update time, so the scan resumes from the last update time it committed rather than from
+    its pagination offset, which items updated in the meantime shift. Items updated at that time are requested again
+    and deduplicated by merge. Without such scan `params` are returned.
+    """
+    if checkpoint.get("items") != params["items"]:
+        checkpoint.clear()
+        checkpoint["items"] = params["items"]
+    elif checkpoint.get("update_time", "") > params["since_timestamp"]:
+        return dict(params, since_timestamp=checkpoint["update_time"])
+    return params
+
+
+def _recents_update_time(page: List[Dict[str, Any]]) -> Optional[str]:
+    """Returns the last update time of the items of a /recents page"""
+    return max(
+        filter(None, map(_update_time, _extract_recents_data(page))), default=None
+    )
+
+
+def _update_time(data_item: Dict[str, Any]) -> Optional[str]:
+    # users are the only entity that has `modified` instead of `update_time`
+    return data_item.get("update_time") or data_item.get("modified")
+
+
+def _time_windows(start: str, window_days: int) -> List[Tuple[str, Optional[str]]]:
+    """Splits the time from `start` to now into windows of `window_days`, the last window has no end"""
+    window_start = ensure_pendulum_datetime(start)
+    now = pendulum.now("UTC")
+    windows: List[Tuple[str, Optional[str]]] = []
+    while window_start.add(days=window_days) < now:
+        window_end = window_start.add(days=window_days)
+        windows.append(
+            (
+                window_start.strftime(TIMESTAMP_FORMAT),
+                window_end.strftime(TIMESTAMP_FORMAT),
+            )
+        )
+        window_start = window_end
+    windows.append((window_start.strftime(TIMESTAMP_FORMAT), None))
+    return windows
+
+
+def _get_first_update_time(
+    entity: str,
+    pipedrive_api_key: str,
+    since_timestamp: str,
+    client: Optional[PipedriveClient] = None,
+) -> Optional[str]:
     pages = get_pages(
         "recents",
         pipedrive_api_key,
         extra_params=dict(since_timestamp=since_timestamp, items=entity),
+        client=client,
     )
-    pages = (_extract_recents_data(page) for page in pages)
     for page in pages:
-        yield rename_fields(page, custom_fields_mapping)
+        pages.close()  # type: ignore[attr-defined]
+        return min(
+            filter(None, map(_update_time, _extract_recents_data(page))), default=None
+        )
+    return None
+
 
+def _get_recent_window_pages(
+    entity: str,
+    pipedrive_api_key: str,
+    window_start: str,
+    window_end: Optional[str],
+    stream_json: bool = False,
+    client: Optional[PipedriveClient] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Requests the items of `entity` updated from `window_start` until `window_end`
+
+    /recents has no end parameter but returns items ordered by update time, so pagination stops
+    at the first item updated after the end of the window.
+    """
+    window_pages = []
+    pages = get_pages(
+        "recents",
+        pipedrive_api_key,
+        extra_params=dict(since_timestamp=window_start, items=entity),
+        stream_json=stream_json,
+        client=client,
+    )
+    for page in pages:
+        data = _extract_recents_data(page)
+        if window_end is not None:
+            in_window = [
+                data_item
+                for data_item in data
+                if (_update_time(data_item) or "") < window_end
+            ]
+            if len(in_window) < len(data):
+                if in_window:
+                    window_pages.append(in_window)
+                pages.close()  # type: ignore[attr-defined]
+                break
+        if data:
+            window_pages.append(data)
+    return window_pages
 
-__source_name__ = "pipedrive"
+
+def _map_in_order(
+    func: Callable[[T], List[List[R]]],
+    items: Sequence[T],
+    max_workers: int,
+    budget: Optional[MemoryBudget] = None,
+) -> Iterator[List[List[R]]]:
+    """Like `map` with up to `max_workers` items processed in threads ahead of the consumer
+
+    `func` returns a list of pages. Pages processed ahead are accounted in `budget` until the consumer takes
+    the next result. Room for an item is reserved before it is submitted, without waiting: the consumer takes
+    the results in order first when the budget has none left. When the budget has no room left for another
+    producer the items are processed by the consumer.
+    """
+    if max_workers <= 1:
+        yield from map(func, items)
+        return
+    lease = (budget or MemoryBudget()).lease()
+    if lease is None:
+        yield from map(func, items)
+        return
+
+    def _accounted(item: T, reserved: TUsage) -> Tuple[List[List[R]], TUsage]:
+        try:
+            pages = func(item)
+        except BaseException:
+            lease.release(reserved)
+            raise
+        return pages, lease.fill(reserved, pages)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures: Deque[Tuple["Future[Tuple[List[List[R]], TUsage]]", TUsage]] = deque()
+
+    def _next_result() -> Iterator[List[List[R]]]:
+        pages, usage = futures.popleft()[0].result()
+        try:
+            yield pages
+        finally:
+            lease.release(usage)
+
+    try:
+        for item in items:
+            reserved = lease.try_reserve()
+            # a lease without pending items always has room
+            while reserved is None:
+                yield from _next_result()
+                reserved = lease.try_reserve()
+            futures.append((executor.submit(_accounted, item, reserved), reserved))
+            if len(futures) > max_workers:
+                yield from _next_result()
+        while futures:
+            yield from _next_result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for future, reserved in futures:
+            if future.cancelled():
+                lease.release(reserved)
+            elif future.exception() is None:
+                lease.release(future.result()[1])
+        lease.close()
+
+
+def _rename_pages(
+    pages: Iterable[List[Dict[str, Any]]],
+    entity: str,
+    arrow_output: bool = False,
+    include_fields: Optional[Sequence[str]] = None,
+    exclude_fields: Optional[Sequence[str]] = None,
+    arrow_set_fields_as_lists: bool = False,
+) -> Iterator[TDataItems]:
+    custom_fields_mapping = (
+        dlt.current.source_state().get("custom_fields_mapping", {}).get(entity, {})
+    )
+    # custom fields are typed from their definitions instead of being inferred from their values
+    if include_fields is None and not exclude_fields:
+        rename_plan = get_rename_plan(custom_fields_mapping)
+        column_hints = ColumnHints(custom_fields_mapping)
+    else:
+        # fields are dropped before rename, which then looks up only the kept custom fields
+        projection = FieldProjection(
+            custom_fields_mapping, include_fields, exclude_fields, REQUIRED_FIELDS
+        )
+        rename_plan = RenamePlan(projection.fields_mapping)
+        column_hints = ColumnHints(projection.fields_mapping, projection.keeps)
+        pages = map(projection, pages)
+    new_columns: Optional[TTableSchemaColumns]
+    columns, new_columns = column_hints.for_table(dlt.current.resource_name())
+    # arrow tables load set fields as list columns, rows keep them in child tables
+    arrow_output = arrow_output and (
+        arrow_set_fields_as_lists or not rename_plan.set_fields
+    )
+    if arrow_output:
+        from .arrow import page_to_arrow
+    for page in pages:
+        with timed("rename_fields"):
+            column_hints.clean(page)
+            page = (
+                page_to_arrow(page, rename_plan, columns)
+                if arrow_output
+                else rename_plan(page)
+            )
+        if new_columns:
+            # hints apply to the table from the first page on
+            hinted = dlt.mark.with_hints(page, dlt.mark.make_hints(columns=new_columns))
+            new_columns = None
+            yield hinted
+        else:
+            yield page
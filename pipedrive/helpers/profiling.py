@@ -0,0 +1,114 @@
+"""Profiling of pipeline steps with cpu profiles, sampled stacks of all threads and top memory allocators"""
+
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from types import FrameType
+from typing import Any, Dict, Iterator, Optional
+
+# seconds between two samples of the stacks of all threads
+DEFAULT_SAMPLE_INTERVAL = 0.005
+DEFAULT_TOP_ALLOCATORS = 25
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of all other threads at a fixed interval and counts them in collapsed form
+
+    cProfile only profiles the thread it is enabled in, while requests are sent from pools of threads.
+    Collapsed stacks (`thread;outer;...;inner count`) are read by flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL) -> None:
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        names: Dict[Any, str] = {}
+        while not self._stopped.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != self.ident:
+                    self.stacks[_collapse(names.get(thread_id, thread_id), frame)] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _collapse(thread_name: Any, frame: Optional[FrameType]) -> str:
+    functions = []
+    while frame is not None:
+        code = frame.f_code
+        functions.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    functions.append(str(thread_name))
+    return ";".join(reversed(functions))
+
+
+@contextmanager
+def profile_stage(
+    name: str,
+    directory: str,
+    sample_interval: float = DEFAULT_SAMPLE_INTERVAL,
+    top_allocators: int = DEFAULT_TOP_ALLOCATORS,
+) -> Iterator[Dict[str, Any]]:
+    """Profiles the block and writes the profiles to `directory`
+
+    Files written:
+        `{name}.prof`: cProfile of the calling thread, readable with `pstats` or snakeviz.
+        `{name}.collapsed`: sampled stacks of all threads in collapsed form, for flame graphs.
+        `{name}.allocations.txt`: peak traced memory and lines that allocated the most memory still held at the end of the block.
+
+    Yields a dict that holds the `seconds` and `peak_memory` in bytes of the stage when the block exits.
+    tracemalloc slows the block down, so timings are comparable only between profiled runs.
+    """
+    os.makedirs(directory, exist_ok=True)
+    stats: Dict[str, Any] = {}
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    sampler = StackSampler(sample_interval)
+    sampler.start()
+    profiler = cProfile.Profile()
+    started_at = time.perf_counter()
+    profiler.enable()
+    try:
+        yield stats
+    finally:
+        profiler.disable()
+        stats["seconds"] = time.perf_counter() - started_at
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            )
+        )
+        stats["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        if not was_tracing:
+            tracemalloc.stop()
+        path = os.path.join(directory, name)
+        profiler.dump_stats(f"{path}.prof")
+        sampler.write(f"{path}.collapsed")
+        with open(f"{path}.allocations.txt", "w", encoding="utf-8") as f:
+            f.write(
+                f"{name}: {stats['seconds']:.3f}s, peak traced memory {stats['peak_memory'] / 2**20:.1f} MiB\n\n"
+            )
+            for statistic in snapshot.statistics("lineno")[:top_allocators]:
+                f.write(f"{statistic}\n")
@@ -0,0 +1,64 @@
+"""Projection of pages on the fields selected for a resource"""
+
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+from ..typing import TDataPage
+
+# merge and incremental loading need the primary key and the cursor of every row
+REQUIRED_FIELDS = ("id", "update_time", "modified")
+
+
+def resolve_fields(
+    names: Iterable[str], fields_mapping: Dict[str, Any]
+) -> FrozenSet[str]:
+    """Returns the api keys of `names`, which are api keys or names or normalized names of custom fields"""
+    names = frozenset(names)
+    return names | {
+        hash_string
+        for hash_string, field in fields_mapping.items()
+        if field["name"] in names or field["normalized_name"] in names
+    }
+
+
+class FieldProjection:
+    """Fields of one entity kept from its pages, selected with an allowlist or a denylist
+
+    `required` fields are kept even when they are not allowed or are denied.
+    """
+
+    def __init__(
+        self,
+        fields_mapping: Dict[str, Any],
+        include: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None,
+        required: Iterable[str] = (),
+    ) -> None:
+        required = frozenset(required)
+        self.include: Optional[FrozenSet[str]] = None
+        if include is not None:
+            self.include = resolve_fields(include, fields_mapping) | required
+        self.exclude = resolve_fields(exclude or (), fields_mapping) - required
+        # custom fields that were dropped are not renamed nor translated
+        self.fields_mapping = {
+            hash_string: field
+            for hash_string, field in fields_mapping.items()
+            if self.keeps(hash_string)
+        }
+
+    def keeps(self, key: str) -> bool:
+        if self.include is not None:
+            return key in self.include
+        return key not in self.exclude
+
+    def __call__(self, data: TDataPage) -> TDataPage:
+        if self.include is not None:
+            include = self.include
+            for index, data_item in enumerate(data):
+                data[index] = {
+                    key: value for key, value in data_item.items() if key in include
+                }
+        elif self.exclude:
+            for data_item in data:
+                for key in self.exclude:
+                    data_item.pop(key, None)
+        return data
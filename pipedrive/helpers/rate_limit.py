@@ -0,0 +1,144 @@
+"""Client side rate limiting shared by all requests sent with one api token
+
+Pipedrive rate limits are documented here: https://pipedrive.readme.io/docs/core-api-concepts-rate-limiting
+"""
+
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+from dlt.common import logger
+from dlt.sources.helpers.requests import Response
+
+# used until pipedrive reports the limits of the account in the response headers
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+# wait used when a 429 response comes without a `Retry-After` header
+DEFAULT_RETRY_AFTER = 2.0
+
+
+class RateLimiter:
+    """Token bucket that adapts to the `x-ratelimit-*` headers sent by pipedrive
+
+    Every request must take a token with `acquire` and report its response with `update`.
+    The bucket paces requests evenly at `x-ratelimit-limit` per `x-ratelimit-reset` window,
+    requests are never sent when the `x-ratelimit-remaining` budget of the current window is used up
+    and a 429 response blocks all callers until its `Retry-After` passed.
+    """
+
+    def __init__(
+        self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND
+    ) -> None:
+        self.capacity = requests_per_second
+        self.rate = requests_per_second
+        self._tokens = requests_per_second
+        self._updated_at = time.monotonic()
+        self._window = 1.0
+        # budget left in the current rate limit window as reported by pipedrive
+        self._remaining: Optional[float] = None
+        self._reset_at = 0.0
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.wait_time = 0.0
+        """Total seconds callers spent waiting for a token"""
+        self.requests = 0
+        self.throttled = 0
+        """Number of 429 responses received"""
+
+    def acquire(self) -> float:
+        """Blocks until a request may be sent, returns the seconds waited"""
+        started_at = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                delay = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+                if self._remaining is not None and now < self._reset_at:
+                    if self._remaining < 1:
+                        delay = max(delay, self._reset_at - now)
+                if delay <= 0:
+                    self._tokens -= 1
+                    if self._remaining is not None:
+                        self._remaining -= 1
+                    self._in_flight += 1
+                    self.requests += 1
+                    self.wait_time += now - started_at
+                    return now - started_at
+            time.sleep(delay)
+
+    def release(self) -> None:
+        """Returns the token of a request that failed without a response"""
+        with self._lock:
+            self._in_flight -= 1
+
+    def update(self, response: Response) -> Optional[float]:
+        """Adapts the bucket to the rate limit headers of `response`
+
+        Returns the number of seconds to wait before the request can be retried if it was throttled.
+        """
+        headers = response.headers
+        with self._lock:
+            self._in_flight -= 1
+            now = time.monotonic()
+            self._refill(now)
+            limit = _float_header(headers, "x-ratelimit-limit")
+            remaining = _float_header(headers, "x-ratelimit-remaining")
+            reset = _float_header(headers, "x-ratelimit-reset")
+            if limit:
+                if reset:
+                    # the reset header counts down within the window so the longest one seen is the window
+                    self._window = max(self._window, reset)
+                self.capacity = limit
+                self.rate = limit / self._window
+            if remaining is not None and reset is not None:
+                # requests still in flight were not counted by pipedrive yet
+                remaining -= self._in_flight
+                if self._remaining is None or now >= self._reset_at:
+                    self._remaining = remaining
+                    self._reset_at = now + reset
+                else:
+                    self._remaining = min(self._remaining, remaining)
+            if response.status_code != 429:
+                return None
+            self.throttled += 1
+            retry_after = (
+                _float_header(headers, "retry-after") or reset or DEFAULT_RETRY_AFTER
+            )
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+        logger.warning(
+            f"Pipedrive rate limit reached, pausing all requests for {retry_after} seconds"
+        )
+        return retry_after
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+
+def _float_header(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(pipedrive_api_key: str) -> RateLimiter:
+    """Returns the rate limiter shared by all requests using `pipedrive_api_key`"""
+    with _rate_limiters_lock:
+        rate_limiter = _rate_limiters.get(pipedrive_api_key)
+        if rate_limiter is None:
+            rate_limiter = _rate_limiters[pipedrive_api_key] = RateLimiter()
+        return rate_limiter
+
+
+def rate_limit_wait_time() -> float:
+    """Total seconds spent waiting on the rate limiters in this process"""
+    with _rate_limiters_lock:
+        return sum(rate_limiter.wait_time for rate_limiter in _rate_limiters.values())
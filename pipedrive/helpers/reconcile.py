@@ -0,0 +1,95 @@
+"""Detection of records deleted in Pipedrive by comparing sets of ids"""
+
+import base64
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+import dlt
+from dlt.common import logger
+from dlt.common.destination.exceptions import DestinationUndefinedEntity
+
+from .client import PipedriveClient
+from .pages import get_pages
+
+# column with the `hard_delete` hint of the delete markers
+DELETED_COLUMN = "_deleted"
+
+
+def encode_ids(ids: Iterable[int]) -> str:
+    """Encodes a set of ids as a compressed string to keep in state
+
+    Ids are sorted and stored as differences between consecutive ids, which are small and compress well.
+    """
+    deltas = array("q")
+    previous_id = 0
+    for id_ in sorted(set(ids)):
+        deltas.append(id_ - previous_id)
+        previous_id = id_
+    return base64.b64encode(zlib.compress(deltas.tobytes(), 9)).decode("ascii")
+
+
+def decode_ids(encoded: str) -> "array[int]":
+    """Decodes ids encoded by `encode_ids` as a sorted array"""
+    ids = array("q")
+    if not encoded:
+        return ids
+    ids.frombytes(zlib.decompress(base64.b64decode(encoded)))
+    previous_id = 0
+    for index, delta in enumerate(ids):
+        previous_id = ids[index] = previous_id + delta
+    return ids
+
+
+def missing_ids(previous_ids: "array[int]", current_ids: "array[int]") -> List[int]:
+    """Returns ids of sorted `previous_ids` that are not in sorted `current_ids`"""
+    missing = []
+    current_index = 0
+    for id_ in previous_ids:
+        while current_index < len(current_ids) and current_ids[current_index] < id_:
+            current_index += 1
+        if current_index == len(current_ids) or current_ids[current_index] != id_:
+            missing.append(id_)
+    return missing
+
+
+def union_ids(ids: "array[int]", other_ids: "array[int]") -> "array[int]":
+    """Returns sorted ids that are in `ids` or in `other_ids`"""
+    return array("q", sorted(set(ids).union(other_ids)))
+
+
+def get_ids(
+    endpoint: str,
+    pipedrive_api_key: str,
+    extra_params: Optional[Dict[str, Any]] = None,
+    client: Optional[PipedriveClient] = None,
+) -> "array[int]":
+    """Returns sorted ids of all records of a list `endpoint`
+
+    Records are requested with a field selector, so pages hold only ids.
+    """
+    ids = array("q")
+    for page in get_pages(
+        f"{endpoint}:(id)", pipedrive_api_key, extra_params, client=client
+    ):
+        ids.extend(record["id"] for record in page)
+    return array("q", sorted(set(ids)))
+
+
+def get_destination_ids(table_name: str) -> Optional["array[int]"]:
+    """Returns sorted ids of `table_name` in the destination of the current pipeline
+
+    Returns None when the destination cannot be queried with sql.
+    """
+    try:
+        with dlt.current.pipeline().sql_client() as client:
+            rows = client.execute_sql(
+                f"SELECT id FROM {client.make_qualified_table_name(table_name)}"
+            )
+    except DestinationUndefinedEntity:
+        # nothing loaded yet
+        return array("q")
+    except Exception as exc:
+        logger.info(f"Could not read ids of {table_name} from the destination: {exc}")
+        return None
+    return array("q", sorted(row[0] for row in rows or ()))
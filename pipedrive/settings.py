@@ -11,6 +11,10 @@ ENTITY_MAPPINGS = [
     ("user", None, None),
 ]
 
+# cursor columns of /recents entities without `update_time`
+# used instead of `update_time|modified` when resources yield arrow tables
+RECENTS_CURSOR_COLUMNS = {"user": "modified"}
+
 RECENTS_ENTITIES = {
     "activity": "activities",
     "activityType": "activity_types",
@@ -27,3 +31,34 @@ RECENTS_ENTITIES = {
     "task": "tasks",
     "user": "users",
 }
+
+# list endpoints of /recents resources scanned for ids to find records deleted in Pipedrive
+# with the params of the endpoint that return records of all users
+RECONCILE_ENDPOINTS = {
+    "activities": ("activities", {"user_id": 0}),
+    "deals": ("deals", None),
+    "notes": ("notes", None),
+    "organizations": ("organizations", None),
+    "persons": ("persons", None),
+    "products": ("products", None),
+}
+
+# entities with custom fields, renamed in the tables of their resources
+CUSTOM_FIELDS_ENTITIES = tuple(
+    entity for entity, fields_endpoint, _ in ENTITY_MAPPINGS if fields_endpoint
+)
+
+# resources of the source in the order they are yielded, with the entities whose custom fields are renamed in them
+# scripts list them without building the source, which needs dlt and an api key
+RESOURCE_CATALOG = {
+    "custom_fields_mapping": (),
+    **{
+        resource_name: (entity,) if entity in CUSTOM_FIELDS_ENTITIES else ()
+        for entity, resource_name in RECENTS_ENTITIES.items()
+    },
+    "deals_participants": (),
+    # flow entries are split in tables per object type, each renamed with the custom fields of its entity
+    "deals_flow": CUSTOM_FIELDS_ENTITIES,
+    # leads inherit custom fields from deals
+    "leads": ("deal",),
+}
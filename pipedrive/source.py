@@ -0,0 +1,687 @@
+"""Pipedrive source and resources, the package imports them on first use"""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union, Iterator
+
+import dlt
+
+from .helpers.archive import PageArchive
+from .helpers.batching import DEFAULT_BATCH_MAX_ROWS, coalesce_pages
+from .helpers.checkpoint import stop_requested
+from .helpers.client import BASE_URL, PipedriveClient
+from .helpers.column_hints import ColumnHints
+from .helpers.fields_cache import DEFAULT_FIELDS_CACHE_TTL, get_all_fields_pages
+from .helpers.deal_fingerprints import (
+    FINGERPRINT_FIELDS,
+    FLOW_FINGERPRINT_FIELDS,
+    filter_new_flow_entries,
+    get_changed_deals,
+    get_last_flow_timestamp,
+)
+from .helpers.memory_budget import MemoryBudget
+from .helpers.metrics import reset_metrics, timed
+from .helpers.projection import REQUIRED_FIELDS, FieldProjection
+from .helpers.reconcile import (
+    DELETED_COLUMN,
+    decode_ids,
+    encode_ids,
+    get_destination_ids,
+    get_ids,
+    missing_ids,
+    union_ids,
+)
+from .helpers.custom_fields_munger import (
+    RenamePlan,
+    update_fields_mapping,
+    rename_fields,
+    get_rename_plan,
+)
+from .helpers.pages import (
+    get_all_recent_items,
+    get_entity_recent_items,
+    get_recent_items_backfill,
+    get_recent_items_incremental,
+    get_pages,
+    get_pages_concurrently,
+)
+from .helpers import group_deal_flows
+from .typing import TDataPage
+from .settings import (
+    ENTITY_MAPPINGS,
+    RECENTS_CURSOR_COLUMNS,
+    RECENTS_ENTITIES,
+    RECONCILE_ENDPOINTS,
+)
+from dlt.common import logger, pendulum
+from dlt.common.schema.typing import TTableSchemaColumns
+from dlt.common.time import ensure_pendulum_datetime
+from dlt.sources import DltResource, TDataItems
+
+# config and secrets of the source and its resources stay in the `pipedrive` section instead of this module's name
+__source_name__ = "pipedrive"
+
+
+@dlt.source(name="pipedrive")
+def pipedrive_source(
+    pipedrive_api_key: str = dlt.secrets.value,
+    since_timestamp: Optional[Union[pendulum.DateTime, str]] = "1970-01-01 00:00:00",
+    max_workers: int = 1,
+    prefetch_pages: int = 0,
+    stream_json: bool = False,
+    archive_dir: Optional[str] = None,
+    replay_run_id: Optional[str] = None,
+    base_url: str = BASE_URL,
+    arrow_output: bool = False,
+    single_scan: bool = False,
+    skip_unchanged_deals: bool = False,
+    fields_cache_ttl: float = DEFAULT_FIELDS_CACHE_TTL,
+    batch_max_rows: int = DEFAULT_BATCH_MAX_ROWS,
+    batch_max_bytes: Optional[int] = None,
+    batch_max_seconds: Optional[float] = None,
+    backfill_window_days: Optional[int] = None,
+    backfill_max_windows: int = 0,
+    resumable: bool = False,
+    reconcile_deletes: Optional[Sequence[str]] = None,
+    include_fields: Optional[Dict[str, Sequence[str]]] = None,
+    exclude_fields: Optional[Dict[str, Sequence[str]]] = None,
+    memory_budget_pages: Optional[int] = None,
+    memory_budget_rows: Optional[int] = None,
+    memory_budget_bytes: Optional[int] = None,
+    arrow_set_fields_as_lists: bool = False,
+) -> Iterator[DltResource]:
+    """
+    Get data from the Pipedrive API. Supports incremental loading and custom fields mapping.
+
+    Args:
+        pipedrive_api_key: https://pipedrive.readme.io/docs/how-to-find-the-api-token
+        since_timestamp: Starting timestamp for incremental loading. By default complete history is loaded on first run.
+        max_workers: Number of per-deal requests `deals_flow` and `deals_participants` send concurrently. By default deals are requested one by one.
+        prefetch_pages: Number of pages the `/recents` resources and `leads` request in the background while the current page is processed. Each resource holds at most this many pages in memory ahead of extraction.
+        stream_json: Decode `/recents` and `leads` pages while they are downloaded, which lowers peak memory per page at some CPU cost. Requires `ijson`.
+        archive_dir: Directory in which raw api pages of this run are recorded as compressed NDJSON, in a sub folder named after the run id.
+        replay_run_id: Read pages recorded in `archive_dir` by this run instead of requesting the api. Use "latest" for the last recorded run.
+        base_url: Url of the Pipedrive api, can be changed to point the source to a mock server.
+        arrow_output: The `/recents` resources and `leads` yield arrow tables with custom fields renamed and translated column by column,
+            so dlt normalizes them with its arrow fast path and writes parquet load files. Requires `pyarrow`.
+            Incremental cursors are then plain columns (`update_time`, or `modified` for users), which are tracked separately from the default mode.
+            Resources with set fields yield rows, so their values stay in child tables, unless `arrow_set_fields_as_lists` is set.
+            Switching an existing pipeline requires `add_dlt_load_id` and `add_dlt_id` in the `[normalize.parquet_normalizer]` config,
+            so arrow tables have the dlt columns of the tables loaded from rows.
+        single_scan: Page through `/recents` once for all selected `/recents` resources instead of once per resource.
+            The scan keeps the cursor of each resource and starts from the oldest one, the items of each resource are filtered
+            against its own cursor. These cursors are tracked separately from the incremental cursors of the other modes,
+            a resource scanned for the first time starts from its incremental cursor so an existing pipeline is not reloaded.
+        skip_unchanged_deals: `deals_participants` keeps a fingerprint of each deal's participants count, last activity date and stage
+            in its state and only requests deals whose fingerprint changed. `deals_flow` does the same with the update time added to the fingerprint,
+            as the flow logs every field change, and then loads only entries newer than the last one loaded.
+            Deals lacking one of these fields, e.g. because it is in `exclude_fields`, are always requested.
+        fields_cache_ttl: Seconds during which the *Fields endpoints fetched by a source are re-used by other sources created in the same process.
+            The custom fields mapping is updated and loaded only for entities whose fields changed since the last run.
+        batch_max_rows: `deals_participants` yields the rows of several deals together, in batches of up to this many rows.
+        batch_max_bytes: Optional size limit of the batches of `deals_participants`, measured as json.
+        batch_max_seconds: Optional time after which a batch of `deals_participants` is yielded even if it is not full.
+        backfill_window_days: The `/recents` resources split the history from their cursor to now into windows of this many days
+            and request up to `max_workers` windows at a time. Windows are loaded in order and the end of the last completed window
+            is kept in state, so the cursor moves forward only over completed windows. Cannot be used with `single_scan`.
+        backfill_max_windows: Number of windows loaded per run in backfill mode, so a long backfill is committed in several runs. 0 loads all windows.
+        resumable: The `/recents` resources keep the last update time of their pages in state after every page and stop requesting pages
+            when a stop is requested with `helpers.checkpoint.request_stop` (see `install_sigterm_handler`) or when a request fails.
+            The run then ends normally so the pages extracted so far are loaded, and the next run resumes from the checkpoints.
+            `leads` are sorted from newest to oldest so they are not interrupted, they are skipped if the stop came before them.
+        reconcile_deletes: Names of `/recents` resources whose records deleted in Pipedrive are deleted from the destination
+            by the `deleted_records` resource, one of: activities, deals, notes, organizations, persons, products.
+            `/recents` does not return deleted records, so `deleted_records` requests the ids of all records, compares them
+            with the ids in the destination table (or with the ids of its previous run if the destination cannot be queried)
+            and yields delete markers for missing ids to the resource tables. Child tables are not reconciled.
+        include_fields: Fields loaded by `/recents` resources and `leads`, by resource name. Other fields are dropped right after
+            the page is decoded, before custom fields are renamed. Fields are named by their api key or, for custom fields,
+            by their name in Pipedrive or its normalized name. `id` and the incremental cursor are always loaded,
+            and for `deals` the fields that `deals_flow` and `deals_participants` need.
+        exclude_fields: Fields dropped by `/recents` resources and `leads`, by resource name, named as in `include_fields`.
+            A resource takes either an allowlist or a denylist. Pipedrive does not project `/recents` and `leads` responses,
+            so fields are always downloaded.
+        memory_budget_pages: Maximum number of pages held by all background requests of the source before they are extracted,
+            that is pages read ahead with `prefetch_pages` and pages of concurrent requests of `deals_flow`, `deals_participants`
+            and backfill windows. Each read ahead thread or pool of concurrent requests reserves one page of the budget
+            for as long as it runs, so a budget of n pages runs at most n of them at once and further ones request
+            their pages in the extracting thread. Their other pages wait for room in the budget. The high-water mark is reported
+            by `helpers.memory_budget.memory_high_water`.
+        memory_budget_rows: Maximum number of rows of the pages held by background requests, as `memory_budget_pages`.
+            Room for a page is the largest page received so far and a single resource reads ahead until one is received.
+            A first page larger than the whole budget is still held.
+        memory_budget_bytes: Maximum size of the pages held by background requests measured as json, as `memory_budget_rows`.
+        arrow_set_fields_as_lists: With `arrow_output`, set fields are loaded as list columns of their resource's table instead of
+            `<table>__<field>` child tables. This changes the schema of existing pipelines: the child tables are no longer updated.
+
+    Returns resources:
+        custom_fields_mapping
+        activities
+        activityTypes
+        deals
+        deals_flow
+        deals_participants
+        files
+        filters
+        notes
+        persons
+        organizations
+        pipelines
+        products
+        stages
+        users
+        leads
+        projects
+        tasks
+        deleted_records (with `reconcile_deletes`)
+
+    For custom fields rename the `custom_fields_mapping` resource must be selected or loaded before other resources.
+
+    Resources that depend on another resource are implemented as transformers
+    so they can re-use the original resource data without re-downloading.
+    Examples:  deals_participants, deals_flow
+    """
+
+    if single_scan and backfill_window_days:
+        raise ValueError("single_scan cannot be used with backfill_window_days")
+    include_fields = dict(include_fields or {})
+    exclude_fields = dict(exclude_fields or {})
+    unknown_resources = (set(include_fields) | set(exclude_fields)) - (
+        set(RECENTS_ENTITIES.values()) | {"leads"}
+    )
+    if unknown_resources:
+        raise ValueError(f"Fields cannot be selected for {sorted(unknown_resources)}")
+    if set(include_fields) & set(exclude_fields):
+        raise ValueError(
+            "A resource takes either include_fields or exclude_fields, not both"
+        )
+    if "deals" in include_fields:
+        # deals transformers fingerprint deals by these fields
+        include_fields["deals"] = list(include_fields["deals"]) + list(
+            FINGERPRINT_FIELDS
+        )
+    if skip_unchanged_deals and set(exclude_fields.get("deals", ())) & set(
+        FINGERPRINT_FIELDS
+    ):
+        logger.warning(
+            f"Excluding {FINGERPRINT_FIELDS} from deals disables skip_unchanged_deals, all deals are requested"
+        )
+    unknown_resources = set(reconcile_deletes or ()) - set(RECONCILE_ENDPOINTS)
+    if unknown_resources:
+        raise ValueError(
+            f"Records deleted in Pipedrive cannot be reconciled for {sorted(unknown_resources)}"
+        )
+
+    # metrics are exported per run and a source is created for each run
+    reset_metrics()
+    archive = None
+    if archive_dir:
+        archive = PageArchive(
+            archive_dir,
+            run_id=None if replay_run_id == "latest" else replay_run_id,
+            replay=replay_run_id is not None,
+        )
+    # all resources of the source send requests with its client, whose url, archive and budget are not shared
+    # with other sources. The connection pool of the api token is sized to the number of threads sending requests,
+    # *Fields endpoints are all requested at once before other resources start
+    client = PipedriveClient(
+        pipedrive_api_key,
+        max_connections=max(
+            max_workers + (len(RECENTS_ENTITIES) + 1 if prefetch_pages else 1),
+            sum(fields_entity is not None for _, fields_entity, _ in ENTITY_MAPPINGS),
+        ),
+        base_url=base_url,
+        archive=archive,
+        memory_budget=MemoryBudget(
+            memory_budget_pages, memory_budget_rows, memory_budget_bytes
+        ),
+    )
+
+    # yield nice rename mapping
+    yield create_state(pipedrive_api_key, fields_cache_ttl, client) | parsed_mapping
+
+    # parse timestamp and build kwargs
+    since_timestamp = ensure_pendulum_datetime(since_timestamp).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    resource_kwargs: Any = (
+        {"since_timestamp": since_timestamp} if since_timestamp else {}
+    )
+    resource_kwargs["prefetch_pages"] = prefetch_pages
+    resource_kwargs["stream_json"] = stream_json
+    resource_kwargs["arrow_output"] = arrow_output
+    resource_kwargs["resumable"] = resumable
+    resource_kwargs["arrow_set_fields_as_lists"] = arrow_set_fields_as_lists
+    resource_kwargs["client"] = client
+
+    if single_scan:
+        # one scan of /recents routes the items of each entity to the transformer of its resource
+        # the scan keeps the cursor of each entity, the transformers have no incremental
+        recents = dlt.resource(get_all_recent_items, name="recents", selected=False)(
+            pipedrive_api_key,
+            RECENTS_ENTITIES,
+            since_timestamp,
+            prefetch_pages=prefetch_pages,
+            stream_json=stream_json,
+            resumable=resumable,
+            client=client,
+        )
+
+    # create resources for all endpoints
+    endpoints_resources = {}
+    for entity, resource_name in RECENTS_ENTITIES.items():
+        if arrow_output:
+            # arrow tables support only plain column names as incremental cursors
+            resource_kwargs["since_timestamp"] = dlt.sources.incremental(
+                RECENTS_CURSOR_COLUMNS.get(entity, "update_time"), since_timestamp
+            )
+        resource_kwargs["include_fields"] = include_fields.get(resource_name)
+        resource_kwargs["exclude_fields"] = exclude_fields.get(resource_name)
+        if single_scan:
+            endpoints_resources[resource_name] = recents | dlt.transformer(
+                get_entity_recent_items,
+                name=resource_name,
+                primary_key="id",
+                write_disposition="merge",
+            )(
+                entity,
+                arrow_output=arrow_output,
+                include_fields=resource_kwargs["include_fields"],
+                exclude_fields=resource_kwargs["exclude_fields"],
+                arrow_set_fields_as_lists=arrow_set_fields_as_lists,
+                # dlt passes the table name each item is routed to only to an explicitly bound `meta`
+                meta=None,
+            )
+            continue
+        if backfill_window_days:
+            endpoints_resources[resource_name] = dlt.resource(
+                get_recent_items_backfill,
+                name=resource_name,
+                primary_key="id",
+                write_disposition="merge",
+            )(
+                entity,
+                pipedrive_api_key,
+                since_timestamp=resource_kwargs["since_timestamp"],
+                window_days=backfill_window_days,
+                max_workers=max_workers,
+                max_windows=backfill_max_windows,
+                stream_json=stream_json,
+                arrow_output=arrow_output,
+                resumable=resumable,
+                include_fields=resource_kwargs["include_fields"],
+                exclude_fields=resource_kwargs["exclude_fields"],
+                arrow_set_fields_as_lists=arrow_set_fields_as_lists,
+                client=client,
+            )
+            continue
+        endpoints_resources[resource_name] = dlt.resource(
+            get_recent_items_incremental,
+            name=resource_name,
+            primary_key="id",
+            write_disposition="merge",
+        )(entity, pipedrive_api_key, **resource_kwargs)
+
+    yield from endpoints_resources.values()
+
+    # create transformers for deals to participants and flows
+    yield endpoints_resources["deals"] | dlt.transformer(
+        name="deals_participants", write_disposition="merge", primary_key="id"
+    )(_get_deals_participants)(
+        pipedrive_api_key,
+        max_workers,
+        skip_unchanged_deals,
+        batch_max_rows,
+        batch_max_bytes,
+        batch_max_seconds,
+        client,
+    )
+
+    yield endpoints_resources["deals"] | dlt.transformer(
+        name="deals_flow", write_disposition="merge", primary_key="id"
+    )(_get_deals_flow)(pipedrive_api_key, max_workers, skip_unchanged_deals, client)
+
+    # if simple value is passed in place of incremental, it will be used as initial value
+    yield leads(
+        pipedrive_api_key,
+        update_time=since_timestamp,  # type: ignore[arg-type]
+        prefetch_pages=prefetch_pages,
+        stream_json=stream_json,
+        arrow_output=arrow_output,
+        resumable=resumable,
+        include_fields=include_fields.get("leads"),
+        exclude_fields=exclude_fields.get("leads"),
+        arrow_set_fields_as_lists=arrow_set_fields_as_lists,
+        client=client,
+    )
+
+    if reconcile_deletes:
+        yield deleted_records(
+            pipedrive_api_key, reconcile_deletes, arrow_output, client
+        )
+
+
+def _deal_rows(deals_page: TDataItems) -> List[Dict[str, Any]]:
+    if isinstance(deals_page, list):
+        return deals_page
+    # deals are yielded as arrow tables in arrow output mode
+    columns = [
+        column
+        for column in ("id",) + FLOW_FINGERPRINT_FIELDS
+        if column in deals_page.column_names
+    ]
+    return deals_page.select(columns).to_pylist()  # type: ignore[no-any-return]
+
+
+def _get_deals_flow(
+    deals_page: TDataPage,
+    pipedrive_api_key: str,
+    max_workers: int = 1,
+    skip_unchanged_deals: bool = False,
+    client: Optional[PipedriveClient] = None,
+) -> Iterator[TDataItems]:
+    custom_fields_mapping = dlt.current.source_state().get("custom_fields_mapping", {})
+    deals = _deal_rows(deals_page)
+    # flows of all deals of the page are accumulated per table and yielded together
+    flow_groups: Dict[str, List[Dict[str, Any]]] = {}
+    if not skip_unchanged_deals:
+        urls = [f"deals/{deal['id']}/flow" for deal in deals]
+        for pages in get_pages_concurrently(
+            urls, pipedrive_api_key, max_workers, client=client
+        ):
+            # with one worker pages are requested lazily, the timer must not include the requests
+            pages = list(pages)
+            with timed("group_deal_flows"):
+                group_deal_flows(pages, flow_groups)
+        yield from _renamed_deal_flows(flow_groups, custom_fields_mapping)
+        return
+
+    fingerprints = dlt.current.resource_state().setdefault("deal_fingerprints", {})
+    changed_deals = get_changed_deals(deals, fingerprints, FLOW_FINGERPRINT_FIELDS)
+    urls = [f"deals/{deal['id']}/flow" for deal, _ in changed_deals]
+    for (deal, fingerprint), pages in zip(
+        changed_deals,
+        get_pages_concurrently(urls, pipedrive_api_key, max_workers, client=client),
+    ):
+        last_flow_timestamp = get_last_flow_timestamp(fingerprints, deal["id"])
+        pages = filter_new_flow_entries(pages, last_flow_timestamp)
+        last_flow_timestamp = max(
+            (entry["timestamp"] for page in pages for entry in page),
+            default=last_flow_timestamp,
+        )
+        with timed("group_deal_flows"):
+            group_deal_flows(pages, flow_groups)
+        fingerprints[str(deal["id"])] = [fingerprint, last_flow_timestamp]
+    yield from _renamed_deal_flows(flow_groups, custom_fields_mapping)
+
+
+def _renamed_deal_flows(
+    flow_groups: Dict[str, List[Dict[str, Any]]], custom_fields_mapping: Dict[str, Any]
+) -> Iterator[TDataItems]:
+    for entity, page in flow_groups.items():
+        with timed("rename_fields"):
+            page = rename_fields(page, custom_fields_mapping.get(entity, {}))
+        yield dlt.mark.with_table_name(page, "deals_flow_" + entity)
+
+
+def _get_deals_participants(
+    deals_page: TDataPage,
+    pipedrive_api_key: str,
+    max_workers: int = 1,
+    skip_unchanged_deals: bool = False,
+    batch_max_rows: int = DEFAULT_BATCH_MAX_ROWS,
+    batch_max_bytes: Optional[int] = None,
+    batch_max_seconds: Optional[float] = None,
+    client: Optional[PipedriveClient] = None,
+) -> Iterator[TDataItems]:
+    # dlt passes the meta of a deals page on to the batches, which would apply the column hints of
+    # the first page to this table
+    table_name = dlt.current.resource_name()
+    # deals have a few participants each, so their pages are yielded in batches
+    for batch in coalesce_pages(
+        _get_participants_pages(
+            _deal_rows(deals_page),
+            pipedrive_api_key,
+            max_workers,
+            skip_unchanged_deals,
+            client,
+        ),
+        max_rows=batch_max_rows,
+        max_bytes=batch_max_bytes,
+        max_seconds=batch_max_seconds,
+    ):
+        yield dlt.mark.with_table_name(batch, table_name)
+
+
+def _get_participants_pages(
+    deals: List[Dict[str, Any]],
+    pipedrive_api_key: str,
+    max_workers: int = 1,
+    skip_unchanged_deals: bool = False,
+    client: Optional[PipedriveClient] = None,
+) -> Iterator[TDataPage]:
+    if not skip_unchanged_deals:
+        urls = [f"deals/{deal['id']}/participants" for deal in deals]
+        for pages in get_pages_concurrently(
+            urls, pipedrive_api_key, max_workers, client=client
+        ):
+            yield from pages
+        return
+
+    fingerprints = dlt.current.resource_state().setdefault("deal_fingerprints", {})
+    changed_deals = get_changed_deals(deals, fingerprints)
+    urls = [f"deals/{deal['id']}/participants" for deal, _ in changed_deals]
+    for (deal, fingerprint), pages in zip(
+        changed_deals,
+        get_pages_concurrently(urls, pipedrive_api_key, max_workers, client=client),
+    ):
+        yield from pages
+        fingerprints[str(deal["id"])] = [fingerprint]
+
+
+@dlt.resource(selected=False)
+def create_state(
+    pipedrive_api_key: str,
+    fields_cache_ttl: float = DEFAULT_FIELDS_CACHE_TTL,
+    client: Optional[PipedriveClient] = None,
+) -> Iterator[Dict[str, Any]]:
+    def _get_pages_for_rename(entity: str, pages: List[TDataPage]) -> Dict[str, Any]:
+        existing_fields_mapping: Dict[
+            str, Dict[str, str]
+        ] = custom_fields_mapping.setdefault(entity, {})
+        # we need to process all pages before yielding
+        for page in pages:
+            existing_fields_mapping = update_fields_mapping(
+                page, existing_fields_mapping
+            )
+        return existing_fields_mapping
+
+    # gets all *Fields data and stores in state
+    state = dlt.current.source_state()
+    custom_fields_mapping = state.setdefault("custom_fields_mapping", {})
+    fields_hashes = state.setdefault("custom_fields_hashes", {})
+    changed_fields_mapping = {}
+    fields_entities = {
+        entity: fields_entity
+        for entity, fields_entity, _ in ENTITY_MAPPINGS
+        if fields_entity is not None
+    }
+    # all endpoints are requested at once, the mapping is then updated in the order of ENTITY_MAPPINGS
+    # because normalizing names needs the source schema of the extracting thread
+    all_fields_pages = get_all_fields_pages(
+        list(fields_entities.values()), pipedrive_api_key, fields_cache_ttl, client
+    )
+    for entity, (pages, content_hash) in zip(fields_entities, all_fields_pages):
+        # the mapping is up to date if fields did not change since it was last updated
+        if (
+            entity in custom_fields_mapping
+            and fields_hashes.get(entity) == content_hash
+        ):
+            continue
+        custom_fields_mapping[entity] = _get_pages_for_rename(entity, pages)
+        fields_hashes[entity] = content_hash
+        changed_fields_mapping[entity] = custom_fields_mapping[entity]
+
+    # only the mapping of changed entities is loaded
+    yield changed_fields_mapping
+
+
+@dlt.transformer(
+    name="custom_fields_mapping",
+    write_disposition="merge",
+    primary_key=("endpoint", "hash_string"),
+    columns={"options": {"data_type": "json"}},
+)
+def parsed_mapping(
+    custom_fields_mapping: Dict[str, Any]
+) -> Optional[Iterator[List[Dict[str, str]]]]:
+    """
+    Parses and yields custom fields' mapping in order to be stored in destiny by dlt
+    Fields are merged on endpoint and hash string, so entities whose fields did not change are not rewritten
+    """
+    for endpoint, data_item_mapping in custom_fields_mapping.items():
+        yield [
+            {
+                "endpoint": endpoint,
+                "hash_string": hash_string,
+                "name": names["name"],
+                "normalized_name": names["normalized_name"],
+                "options": names["options"],
+                "field_type": names["field_type"],
+            }
+            for hash_string, names in data_item_mapping.items()
+        ]
+
+
+@dlt.resource(primary_key="id", write_disposition="merge")
+def leads(
+    pipedrive_api_key: str = dlt.secrets.value,
+    update_time: dlt.sources.incremental[str] = dlt.sources.incremental(
+        "update_time", "1970-01-01 00:00:00"
+    ),
+    prefetch_pages: int = 0,
+    stream_json: bool = False,
+    arrow_output: bool = False,
+    resumable: bool = False,
+    first_page_size: int = 50,
+    include_fields: Optional[Sequence[str]] = None,
+    exclude_fields: Optional[Sequence[str]] = None,
+    arrow_set_fields_as_lists: bool = False,
+    client: Optional[PipedriveClient] = None,
+) -> Iterator[TDataItems]:
+    """Resource to incrementally load pipedrive leads by update_time"""
+    # leads are loaded from newest to oldest, so an interrupted pagination could not resume past the cursor
+    if resumable and stop_requested():
+        return
+    # Leads inherit custom fields from deals
+    fields_mapping = (
+        dlt.current.source_state().get("custom_fields_mapping", {}).get("deal", {})
+    )
+    # Load leads pages sorted from newest to oldest and stop loading at the
+    # first lead updated before the last incremental value. Incremental runs
+    # usually touch few leads so the first page is small
+    pages = get_pages(
+        "leads",
+        pipedrive_api_key,
+        extra_params={"sort": "update_time DESC"},
+        prefetch_pages=prefetch_pages,
+        stream_json=stream_json,
+        first_page_size=first_page_size,
+        client=client,
+    )
+    rename_plan = get_rename_plan(fields_mapping)
+    column_hints = ColumnHints(fields_mapping)
+    projection = None
+    if include_fields is not None or exclude_fields:
+        projection = FieldProjection(
+            fields_mapping, include_fields, exclude_fields, REQUIRED_FIELDS
+        )
+        rename_plan = RenamePlan(projection.fields_mapping)
+        column_hints = ColumnHints(projection.fields_mapping, projection.keeps)
+    new_columns: Optional[TTableSchemaColumns]
+    columns, new_columns = column_hints.for_table(dlt.current.resource_name())
+    arrow_output = arrow_output and (
+        arrow_set_fields_as_lists or not rename_plan.set_fields
+    )
+    if arrow_output:
+        from .helpers.arrow import page_to_arrow
+    start_value = update_time.start_value or ""
+    for page in pages:
+        cutoff = next(
+            (
+                index
+                for index, lead in enumerate(page)
+                if (lead.get("update_time") or "") < start_value
+            ),
+            None,
+        )
+        if cutoff is not None:
+            page = page[:cutoff]
+        if projection:
+            page = projection(page)
+        if page:
+            with timed("rename_fields"):
+                column_hints.clean(page)
+                page = (
+                    page_to_arrow(page, rename_plan, columns)
+                    if arrow_output
+                    else rename_plan(page)
+                )
+            if new_columns:
+                hinted = dlt.mark.with_hints(
+                    page, dlt.mark.make_hints(columns=new_columns)
+                )
+                new_columns = None
+                yield hinted
+            else:
+                yield page
+        if cutoff is not None:
+            return
+
+
+@dlt.resource(
+    primary_key="id",
+    write_disposition="merge",
+    columns={DELETED_COLUMN: {"data_type": "bool", "hard_delete": True}},
+)
+def deleted_records(
+    pipedrive_api_key: str,
+    resource_names: Sequence[str],
+    arrow_output: bool = False,
+    client: Optional[PipedriveClient] = None,
+) -> Iterator[TDataItems]:
+    """Yields delete markers for records of `resource_names` that were deleted in Pipedrive
+
+    Markers are yielded to the table of each resource, merging them deletes the records from the destination.
+    Ids of each run are kept in state as compressed arrays, they are used when the destination cannot be queried.
+    Ids are paged by offset, so a record deleted during the scan shifts the records after it and some are skipped.
+    When ids are missing they are all requested again, only ids missing from both scans are deleted.
+    """
+    if arrow_output:
+        # tables loaded from arrow do not have the columns dlt adds to rows
+        from .helpers.arrow import page_to_arrow
+    id_sets = dlt.current.resource_state().setdefault("id_sets", {})
+    for resource_name in resource_names:
+        endpoint, extra_params = RECONCILE_ENDPOINTS[resource_name]
+        current_ids = get_ids(endpoint, pipedrive_api_key, extra_params, client)
+        previous_ids = get_destination_ids(resource_name)
+        if previous_ids is None:
+            previous_ids = decode_ids(id_sets.get(resource_name, ""))
+        if not current_ids and previous_ids:
+            # an empty list is more likely a permission problem than all records being deleted
+            logger.warning(
+                f"Pipedrive returned no {resource_name}, records are not reconciled"
+            )
+            continue
+        deleted_ids = missing_ids(previous_ids, current_ids)
+        if deleted_ids:
+            current_ids = union_ids(
+                current_ids, get_ids(endpoint, pipedrive_api_key, extra_params, client)
+            )
+            deleted_ids = missing_ids(previous_ids, current_ids)
+        id_sets[resource_name] = encode_ids(current_ids)
+        if not deleted_ids:
+            continue
+        markers = [{"id": id_, DELETED_COLUMN: True} for id_ in deleted_ids]
+        yield dlt.mark.with_table_name(
+            page_to_arrow(markers, get_rename_plan({})) if arrow_output else markers,
+            resource_name,
+        )
@@ -4,14 +4,70 @@ Pipeline Pipedrive vers BigQuery avec dlt
 Script principal pour l'ingestion des données
 """
 
-import dlt
+import os
 import argparse
 from datetime import datetime, timedelta
-from pipedrive import pipedrive_source
 
+# dlt et la source sont importés seulement par les modes qui chargent des données,
+# --help et --mode resources démarrent ainsi sans les importer
+LOAD_MODES = ("all", "selected", "incremental", "backfill", "reconcile")
 
-def load_all_data(pipeline_name="pipedrive", dataset_name="pipedrive_data"):
+# metrics.json et pipedrive.prom (textfile collector Prometheus) sont écrits ici après chaque exécution
+METRICS_DIR = os.getenv("PIPEDRIVE_METRICS_DIR", "logs")
+# répertoire des profils de --profile, None sans profilage
+PROFILE_DIR = None
+_profiled_runs = 0
+
+
+def print_client_stats(pipeline):
+    """Affiche les statistiques des requêtes envoyées à Pipedrive et exporte les métriques par endpoint"""
+    from pipedrive.helpers.client import pool_stats
+    from pipedrive.helpers.memory_budget import memory_high_water
+    from pipedrive.helpers.metrics import export_metrics
+    from pipedrive.helpers.rate_limit import rate_limit_wait_time
+    
+    stats = pool_stats()
+    print(f"⏱️  Attente rate limit Pipedrive: {rate_limit_wait_time():.1f}s")
+    print(
+        f"🔌 Requêtes: {stats['requests']} "
+        f"(connexions réutilisées: {stats['pool_hits']}, ouvertes: {stats['pool_misses']})"
+    )
+    high_water = memory_high_water()
+    print(f"🧠 Pages en mémoire au plus: {high_water['pages']} ({high_water['rows']} lignes)")
+    json_path, prom_path = export_metrics(METRICS_DIR, pipeline)
+    print(f"📈 Métriques exportées: {json_path}, {prom_path}")
+
+
+def run_pipeline(pipeline, source):
+    """Exécute le pipeline, étape par étape avec un profil par étape si --profile est passé"""
+    global _profiled_runs
+    if not PROFILE_DIR:
+        return pipeline.run(source)
+    
+    from pipedrive.helpers.profiling import profile_stage
+    
+    _profiled_runs += 1
+    run_dir = os.path.join(PROFILE_DIR, f"run_{_profiled_runs}")
+    stages = [
+        # comme pipeline.run: restaure l'état depuis la destination et charge les paquets en attente
+        ("sync", lambda: pipeline.run()),
+        ("extract", lambda: pipeline.extract(source)),
+        ("normalize", lambda: pipeline.normalize()),
+        ("load", lambda: pipeline.load()),
+    ]
+    for name, stage in stages:
+        with profile_stage(name, run_dir) as stats:
+            result = stage()
+        print(f"⏱️  {name}: {stats['seconds']:.1f}s (pic mémoire: {stats['peak_memory'] / 2**20:.0f} Mo)")
+    print(f"🔬 Profils écrits dans {run_dir}")
+    return result
+
+
+def load_all_data(pipeline_name="pipedrive", dataset_name="pipedrive_data", resumable=False):
     """Charge toutes les données Pipedrive"""
+    import dlt
+    from pipedrive import pipedrive_source
+    
     print("🔄 Chargement de toutes les données Pipedrive...")
     
     pipeline = dlt.pipeline(
@@ -20,14 +76,18 @@ def load_all_data(pipeline_name="pipedrive", dataset_name="pipedrive_data"):
         dataset_name=dataset_name
     )
     
-    load_info = pipeline.run(pipedrive_source())
+    load_info = run_pipeline(pipeline, pipedrive_source(resumable=resumable))
     print("✅ Chargement terminé!")
     print(load_info)
+    print_client_stats(pipeline)
     return load_info
 
 
-def load_selected_resources(resources, pipeline_name="pipedrive", dataset_name="pipedrive_data"):
+def load_selected_resources(resources, pipeline_name="pipedrive", dataset_name="pipedrive_data", resumable=False):
     """Charge seulement les ressources sélectionnées"""
+    import dlt
+    from pipedrive import pipedrive_source
+    
     print(f"🔄 Chargement des ressources: {', '.join(resources)}")
     
     pipeline = dlt.pipeline(
@@ -40,15 +100,20 @@ def load_selected_resources(resources, pipeline_name="pipedrive", dataset_name="
     if "custom_fields_mapping" not in resources:
         resources.append("custom_fields_mapping")
     
-    source = pipedrive_source().with_resources(*resources)
-    load_info = pipeline.run(source)
+    source = pipedrive_source(resumable=resumable).with_resources(*resources)
+    load_info = run_pipeline(pipeline, source)
     print("✅ Chargement terminé!")
     print(load_info)
+    print_client_stats(pipeline)
     return load_info
 
 
-def load_incremental(since_date, resources=None, pipeline_name="pipedrive", dataset_name="pipedrive_data"):
+def load_incremental(since_date, resources=None, pipeline_name="pipedrive", dataset_name="pipedrive_data",
+                     resumable=False):
     """Charge les données de manière incrémentale depuis une date donnée"""
+    import dlt
+    from pipedrive import pipedrive_source
+    
     print(f"🔄 Chargement incrémental depuis {since_date}...")
     
     pipeline = dlt.pipeline(
@@ -61,14 +126,97 @@ def load_incremental(since_date, resources=None, pipeline_name="pipedrive", data
         # Charger seulement les ressources spécifiées
         if "custom_fields_mapping" not in resources:
             resources.append("custom_fields_mapping")
-        source = pipedrive_source(since_timestamp=since_date).with_resources(*resources)
+        source = pipedrive_source(since_timestamp=since_date, resumable=resumable).with_resources(*resources)
     else:
         # Charger toutes les ressources
-        source = pipedrive_source(since_timestamp=since_date)
+        source = pipedrive_source(since_timestamp=since_date, resumable=resumable)
     
-    load_info = pipeline.run(source)
+    load_info = run_pipeline(pipeline, source)
     print("✅ Chargement incrémental terminé!")
     print(load_info)
+    print_client_stats(pipeline)
+    return load_info
+
+
+def _backfill_remaining_windows(pipeline, source):
+    resources_state = pipeline.state.get("sources", {}).get("pipedrive", {}).get("resources", {})
+    return sum(
+        resources_state.get(name, {}).get("backfill_remaining_windows", 0)
+        for name in source.selected_resources
+    )
+
+
+def load_backfill(since_date, resources=None, window_days=30, max_workers=4, windows_per_run=12,
+                  pipeline_name="pipedrive", dataset_name="pipedrive_data", resumable=False):
+    """Charge l'historique par fenêtres de temps en parallèle, en plusieurs exécutions
+
+    Chaque exécution charge au plus `windows_per_run` fenêtres par ressource et enregistre sa progression,
+    une erreur ne fait donc perdre que les fenêtres de l'exécution en cours.
+    """
+    import dlt
+    from pipedrive import pipedrive_source
+    from pipedrive.helpers.checkpoint import stop_requested
+    
+    print(f"🔄 Backfill depuis {since_date} par fenêtres de {window_days} jours...")
+    
+    pipeline = dlt.pipeline(
+        pipeline_name=pipeline_name,
+        destination='bigquery',
+        dataset_name=dataset_name
+    )
+    
+    if resources and "custom_fields_mapping" not in resources:
+        resources.append("custom_fields_mapping")
+    
+    run = 0
+    while True:
+        run += 1
+        source = pipedrive_source(
+            since_timestamp=since_date,
+            max_workers=max_workers,
+            backfill_window_days=window_days,
+            backfill_max_windows=windows_per_run,
+            resumable=resumable,
+        )
+        if resources:
+            source = source.with_resources(*resources)
+        load_info = run_pipeline(pipeline, source)
+        print(f"✅ Exécution {run} terminée!")
+        print(load_info)
+        remaining = _backfill_remaining_windows(pipeline, source)
+        if not remaining or stop_requested():
+            break
+        print(f"📅 Fenêtres restantes: {remaining}")
+    
+    if not stop_requested():
+        print("✅ Backfill terminé!")
+    print_client_stats(pipeline)
+    return load_info
+
+
+def load_reconcile(resources=None, pipeline_name="pipedrive", dataset_name="pipedrive_data"):
+    """Supprime du dataset les enregistrements supprimés dans Pipedrive
+
+    Seuls les ids sont demandés à Pipedrive, puis comparés aux ids des tables.
+    """
+    import dlt
+    from pipedrive import pipedrive_source
+    from pipedrive.settings import RECONCILE_ENDPOINTS
+    
+    resources = resources or list(RECONCILE_ENDPOINTS)
+    print(f"🔄 Réconciliation des suppressions: {', '.join(resources)}")
+    
+    pipeline = dlt.pipeline(
+        pipeline_name=pipeline_name,
+        destination='bigquery',
+        dataset_name=dataset_name
+    )
+    
+    source = pipedrive_source(reconcile_deletes=resources).with_resources("deleted_records")
+    load_info = run_pipeline(pipeline, source)
+    print("✅ Réconciliation terminée!")
+    print(load_info)
+    print_client_stats(pipeline)
     return load_info
 
 
@@ -76,11 +224,14 @@ def show_available_resources():
     """Affiche les ressources disponibles"""
     print("📋 Ressources disponibles dans Pipedrive:")
     
-    source = pipedrive_source()
-    resources = list(source.resources.keys())
+    # catalogue statique: le package pipedrive n'importe dlt qu'avec la source, ni dlt ni clé API ne sont nécessaires
+    from pipedrive.settings import RESOURCE_CATALOG
+    
+    resources = list(RESOURCE_CATALOG)
     
     for i, resource in enumerate(resources, 1):
-        print(f"{i:2d}. {resource}")
+        custom_fields = " (champs personnalisés)" if RESOURCE_CATALOG[resource] else ""
+        print(f"{i:2d}. {resource}{custom_fields}")
     
     print(f"\nTotal: {len(resources)} ressources")
     return resources
@@ -88,6 +239,8 @@ def show_available_resources():
 
 def get_pipeline_info(pipeline_name="pipedrive"):
     """Affiche les informations du pipeline"""
+    import dlt
+    
     try:
         pipeline = dlt.pipeline(pipeline_name=pipeline_name)
         print(f"📊 Informations du pipeline '{pipeline_name}':")
@@ -99,13 +252,24 @@ def get_pipeline_info(pipeline_name="pipedrive"):
 
 
 def main():
+    global PROFILE_DIR
     parser = argparse.ArgumentParser(description="Pipeline Pipedrive vers BigQuery")
-    parser.add_argument("--mode", choices=["all", "selected", "incremental", "info", "resources"], 
+    parser.add_argument("--mode", choices=["all", "selected", "incremental", "backfill", "reconcile", "info", "resources"], 
                        default="all", help="Mode d'exécution")
     parser.add_argument("--resources", nargs="+", 
-                       help="Ressources à charger (pour mode 'selected')")
+                       help="Ressources à charger (pour mode 'selected') ou à réconcilier (pour mode 'reconcile')")
     parser.add_argument("--since", 
                        help="Date de début pour le chargement incrémental (format: YYYY-MM-DD)")
+    parser.add_argument("--window-days", type=int, default=30,
+                       help="Taille des fenêtres de temps en jours (pour mode 'backfill')")
+    parser.add_argument("--max-workers", type=int, default=4,
+                       help="Fenêtres chargées en parallèle (pour mode 'backfill')")
+    parser.add_argument("--windows-per-run", type=int, default=12,
+                       help="Fenêtres chargées par exécution et par ressource (pour mode 'backfill')")
+    parser.add_argument("--resumable", action="store_true",
+                       help="Arrête l'extraction proprement sur SIGTERM ou sur une requête en échec, la prochaine exécution reprend au dernier checkpoint")
+    parser.add_argument("--profile", action="store_true",
+                       help="Profile les étapes extract, normalize et load (cProfile, piles pour flame graph, tracemalloc) dans logs/")
     parser.add_argument("--pipeline-name", default="pipedrive",
                        help="Nom du pipeline")
     parser.add_argument("--dataset-name", default="pipedrive_data",
@@ -116,16 +280,26 @@ def main():
     print("🚀 Pipeline Pipedrive vers BigQuery")
     print("=" * 40)
     
+    if args.resumable and args.mode in LOAD_MODES:
+        from pipedrive.helpers.checkpoint import install_sigterm_handler, stop_requested
+        
+        # SIGTERM (timeout GitHub Actions, cron) arrête l'extraction proprement: les pages déjà extraites
+        # sont chargées et la prochaine exécution reprend au dernier checkpoint
+        install_sigterm_handler()
+    
+    if args.profile:
+        PROFILE_DIR = os.path.join(METRICS_DIR, f"profile_{datetime.now():%Y%m%d_%H%M%S}")
+    
     try:
         if args.mode == "all":
-            load_all_data(args.pipeline_name, args.dataset_name)
+            load_all_data(args.pipeline_name, args.dataset_name, args.resumable)
             
         elif args.mode == "selected":
             if not args.resources:
                 print("❌ Veuillez spécifier les ressources avec --resources")
                 print("Exemple: --resources deals persons products")
                 return
-            load_selected_resources(args.resources, args.pipeline_name, args.dataset_name)
+            load_selected_resources(args.resources, args.pipeline_name, args.dataset_name, args.resumable)
             
         elif args.mode == "incremental":
             if not args.since:
@@ -135,7 +309,15 @@ def main():
             else:
                 since_date = f"{args.since} 00:00:00Z"
             
-            load_incremental(since_date, args.resources, args.pipeline_name, args.dataset_name)
+            load_incremental(since_date, args.resources, args.pipeline_name, args.dataset_name, args.resumable)
+            
+        elif args.mode == "backfill":
+            since_date = f"{args.since} 00:00:00Z" if args.since else "1970-01-01 00:00:00Z"
+            load_backfill(since_date, args.resources, args.window_days, args.max_workers,
+                          args.windows_per_run, args.pipeline_name, args.dataset_name, args.resumable)
+            
+        elif args.mode == "reconcile":
+            load_reconcile(args.resources, args.pipeline_name, args.dataset_name)
             
         elif args.mode == "resources":
             show_available_resources()
@@ -147,6 +329,10 @@ def main():
         print(f"❌ Erreur lors de l'exécution: {e}")
         return 1
     
+    if args.resumable and args.mode in LOAD_MODES and stop_requested():
+        print("⚠️  Exécution interrompue, la prochaine exécution reprendra au dernier checkpoint")
+        return 1
+    
     return 0
 
 
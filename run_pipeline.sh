@@ -34,19 +34,21 @@ fi
 
 # Mode de chargement (peut être modifié selon les besoins)
 MODE=${1:-"incremental"}  # Par défaut: chargement incrémental
+# Les arguments suivants sont passés à pipedrive_main.py, par exemple --profile
+EXTRA_ARGS=("${@:2}")
 
 case $MODE in
     "all")
         log "📊 Mode: Chargement complet"
-        python3 pipedrive_main.py --mode all >> "$LOG_FILE" 2>&1
+        python3 pipedrive_main.py --mode all "${EXTRA_ARGS[@]}" >> "$LOG_FILE" 2>&1
         ;;
     "incremental")
         log "📊 Mode: Chargement incrémental (7 derniers jours)"
-        python3 pipedrive_main.py --mode incremental >> "$LOG_FILE" 2>&1
+        python3 pipedrive_main.py --mode incremental "${EXTRA_ARGS[@]}" >> "$LOG_FILE" 2>&1
         ;;
     "selected")
         log "📊 Mode: Chargement sélectif (deals, persons, products)"
-        python3 pipedrive_main.py --mode selected --resources deals persons products >> "$LOG_FILE" 2>&1
+        python3 pipedrive_main.py --mode selected --resources deals persons products "${EXTRA_ARGS[@]}" >> "$LOG_FILE" 2>&1
         ;;
     *)
         log "❌ Mode invalide: $MODE"
@@ -65,6 +67,7 @@ fi
 
 # Nettoyer les anciens logs (garder seulement les 30 derniers jours)
 find "$LOG_DIR" -name "pipedrive_*.log" -mtime +30 -delete 2>/dev/null
+find "$LOG_DIR" -maxdepth 1 -type d -name "profile_*" -mtime +30 -exec rm -rf {} + 2>/dev/null
 
 log "🏁 Script terminé"
 
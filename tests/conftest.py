@@ -0,0 +1,40 @@
+"""Fixtures running the source against the local mock Pipedrive server of benchmarks/"""
+
+import threading
+from typing import Any, Iterator, Tuple
+
+import dlt
+import pytest
+
+from benchmarks.mock_pipedrive import MockConfig, create_server
+from pipedrive.helpers.checkpoint import clear_stop_request
+
+
+@pytest.fixture
+def mock_api() -> Iterator[Tuple[MockConfig, str]]:
+    """Starts a mock server in a thread, tests may change its config while it runs"""
+    config = MockConfig(rows=600, custom_fields=8, participants=2)
+    server = create_server(config)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield config, f"http://127.0.0.1:{server.server_port}/v1"
+    finally:
+        server.shutdown()
+        server.server_close()
+        clear_stop_request()
+
+
+@pytest.fixture
+def make_pipeline(tmp_path: Any) -> Any:
+    """Creates pipelines loading to duckdb databases in the test directory"""
+
+    def _make_pipeline(name: str = "pipedrive_test") -> dlt.Pipeline:
+        return dlt.pipeline(
+            pipeline_name=name,
+            destination=dlt.destinations.duckdb(str(tmp_path / f"{name}.duckdb")),
+            dataset_name="pipedrive_data",
+            pipelines_dir=str(tmp_path / "pipelines"),
+        )
+
+    return _make_pipeline
@@ -0,0 +1,58 @@
+import pytest
+
+from pipedrive import pipedrive_source
+from pipedrive.helpers.arrow import page_to_arrow
+from pipedrive.helpers.custom_fields_munger import RenamePlan
+
+from .utils import table_counts
+
+
+def test_page_to_arrow_has_columns_of_all_rows():
+    table = page_to_arrow([{"id": 1}, {"id": 2, "title": "Deal"}], RenamePlan({}))
+
+    assert table.column_names == ["id", "title"]
+    assert table.column("title").to_pylist() == [None, "Deal"]
+
+
+@pytest.mark.parametrize("arrow_set_fields_as_lists", [False, True])
+def test_arrow_output_set_fields(mock_api, make_pipeline, arrow_set_fields_as_lists):
+    config, base_url = mock_api
+    config.rows = 100
+    pipeline = make_pipeline()
+    source = pipedrive_source(
+        pipedrive_api_key="test",
+        base_url=base_url,
+        arrow_output=True,
+        arrow_set_fields_as_lists=arrow_set_fields_as_lists,
+    )
+    pipeline.run(source.with_resources("custom_fields_mapping", "deals"))
+
+    tables = pipeline.default_schema.tables
+    if arrow_set_fields_as_lists:
+        assert "deals__custom_set_5" not in tables
+        assert "custom_set_5" in tables["deals"]["columns"]
+    else:
+        # two options are set on every deal
+        assert table_counts(pipeline, ["deals__custom_set_5"]) == {
+            "deals__custom_set_5": 2 * config.rows
+        }
+
+
+def test_existing_pipeline_switches_to_arrow_output(
+    mock_api, make_pipeline, monkeypatch
+):
+    config, base_url = mock_api
+    config.rows = 100
+    # tables loaded from rows have the dlt columns, which arrow tables need as well
+    monkeypatch.setenv("NORMALIZE__PARQUET_NORMALIZER__ADD_DLT_LOAD_ID", "true")
+    monkeypatch.setenv("NORMALIZE__PARQUET_NORMALIZER__ADD_DLT_ID", "true")
+    pipeline = make_pipeline()
+    for arrow_output in (False, True):
+        source = pipedrive_source(
+            pipedrive_api_key="test",
+            base_url=base_url,
+            arrow_output=arrow_output,
+        )
+        pipeline.run(source.with_resources("custom_fields_mapping", "users"))
+
+    assert table_counts(pipeline, ["users"]) == {"users": 20}
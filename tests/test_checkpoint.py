@@ -0,0 +1,94 @@
+import pytest
+from dlt.sources.helpers import requests
+
+from pipedrive import pipedrive_source
+from pipedrive.helpers.checkpoint import (
+    checkpointed_pages,
+    clear_stop_request,
+    stop_requested,
+    until_stopped,
+)
+from pipedrive.helpers.pages import _recents_update_time, _resume_from_checkpoint
+
+from .utils import table_counts
+
+RESOURCES = ["activities", "deals"]
+
+
+@pytest.mark.parametrize("single_scan", [False, True])
+def test_interrupted_run_resumes_from_checkpoint(mock_api, make_pipeline, single_scan):
+    config, base_url = mock_api
+    pipeline = make_pipeline()
+
+    # the second page of every /recents scan fails, which stops the run after the first page
+    config.fail_recents_from = 500
+    source = pipedrive_source(
+        pipedrive_api_key="test",
+        base_url=base_url,
+        resumable=True,
+        single_scan=single_scan,
+    )
+    pipeline.run(source.with_resources(*RESOURCES))
+    assert stop_requested()
+    interrupted = table_counts(pipeline, RESOURCES)
+    assert 0 < sum(interrupted.values()) < len(RESOURCES) * config.rows
+
+    config.fail_recents_from = None
+    clear_stop_request()
+    source = pipedrive_source(
+        pipedrive_api_key="test",
+        base_url=base_url,
+        resumable=True,
+        single_scan=single_scan,
+    )
+    pipeline.run(source.with_resources(*RESOURCES))
+    row_counts = pipeline.last_trace.last_normalize_info.row_counts
+
+    assert table_counts(pipeline, RESOURCES) == {
+        resource: config.rows for resource in RESOURCES
+    }
+    # the resumed run requests only the pages after the checkpoint
+    for resource in RESOURCES:
+        assert row_counts.get(resource, 0) < config.rows
+
+
+def test_resume_starts_from_last_committed_update_time():
+    def _page(update_time):
+        return [{"item": "deal", "data": {"id": 1, "update_time": update_time}}]
+
+    checkpoint = {}
+    params = {"since_timestamp": "2024-01-01 00:00:00", "items": "deal"}
+    assert _resume_from_checkpoint(checkpoint, params) == params
+
+    pages = checkpointed_pages(
+        iter([_page("2024-01-02 00:00:00"), _page("2024-01-03 00:00:00")]),
+        checkpoint,
+        _recents_update_time,
+    )
+    next(pages)
+    # the run ends while the second page is extracted, so only the first page is committed
+    next(pages)
+    pages.close()
+
+    # offsets shift when items are updated between runs, so the scan resumes from the committed update time
+    assert _resume_from_checkpoint(checkpoint, params) == {
+        "since_timestamp": "2024-01-02 00:00:00",
+        "items": "deal",
+    }
+    # a scan of other items starts over
+    other_params = {"since_timestamp": "2024-01-01 00:00:00", "items": "person"}
+    assert _resume_from_checkpoint(checkpoint, other_params) == other_params
+
+
+def test_only_failed_requests_stop_the_run():
+    def _failing(exc):
+        yield [1]
+        raise exc
+
+    with pytest.raises(ValueError):
+        list(until_stopped(_failing(ValueError("bug"))))
+    assert not stop_requested()
+
+    assert list(until_stopped(_failing(requests.ConnectionError()))) == [[1]]
+    assert stop_requested()
+    clear_stop_request()
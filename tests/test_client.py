@@ -0,0 +1,46 @@
+import pytest
+from dlt.sources.helpers import requests
+
+from pipedrive.helpers import client as client_module
+from pipedrive.helpers.client import PipedriveClient, pool_stats
+from pipedrive.helpers.metrics import get_metrics, reset_metrics
+
+
+def test_pool_stats_count_reused_connections(mock_api):
+    _, base_url = mock_api
+    before = pool_stats()
+    client = PipedriveClient("pool-stats-test", base_url=base_url)
+    for _ in range(3):
+        client.get_page("activityFields", {})
+    stats = pool_stats()
+
+    assert stats["requests"] - before["requests"] == 3
+    # requests of one thread are sent over one keep-alive connection
+    assert stats["pool_misses"] - before["pool_misses"] == 1
+
+
+def test_server_errors_are_retried_and_counted(mock_api, monkeypatch):
+    config, base_url = mock_api
+    monkeypatch.setattr(client_module, "SERVER_ERROR_BACKOFF", 0.0)
+    reset_metrics()
+    config.server_errors = 2
+    client = PipedriveClient("server-errors-test", base_url=base_url)
+
+    page = client.get_page("activityFields", {})
+
+    assert page["success"]
+    endpoint = get_metrics()["endpoints"]["activityFields"]
+    assert endpoint["requests"] == 3
+    assert endpoint["retries"] == 2
+    assert endpoint["throttled"] == 0
+
+
+def test_server_errors_raise_after_last_attempt(mock_api, monkeypatch):
+    config, base_url = mock_api
+    monkeypatch.setattr(client_module, "SERVER_ERROR_BACKOFF", 0.0)
+    config.server_errors = client_module.MAX_SERVER_ERROR_ATTEMPTS
+    client = PipedriveClient("server-errors-test", base_url=base_url)
+
+    with pytest.raises(requests.HTTPError):
+        client.get_page("activityFields", {})
+    assert config.server_errors == 0
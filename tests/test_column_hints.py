@@ -0,0 +1,19 @@
+from pipedrive import pipedrive_source
+
+
+def test_column_hints_of_deals_stay_in_deals_table(mock_api, make_pipeline):
+    config, base_url = mock_api
+    config.rows = 100
+    pipeline = make_pipeline()
+    source = pipedrive_source(pipedrive_api_key="test", base_url=base_url)
+    pipeline.run(
+        source.with_resources("custom_fields_mapping", "deals", "deals_participants")
+    )
+
+    schema = pipeline.default_schema
+    deals_columns = schema.get_table_columns("deals")
+    participants_columns = schema.get_table_columns("deals_participants")
+
+    assert deals_columns["custom_double_1"]["data_type"] == "double"
+    # participants are yielded for deals pages, whose first page carries the hints
+    assert not {name for name in participants_columns if name.startswith("custom_")}
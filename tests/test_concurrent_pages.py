@@ -0,0 +1,161 @@
+import random
+import threading
+import time
+
+import pytest
+
+from benchmarks.mock_pipedrive import FIELDS_ENTITIES, _custom_field_key
+from pipedrive import pipedrive_source
+from pipedrive.helpers.client import PipedriveClient
+from pipedrive.helpers.fields_cache import get_all_fields_pages
+from pipedrive.helpers.memory_budget import MemoryBudget
+from pipedrive.helpers.pages import (
+    _map_in_order,
+    _read_ahead,
+    get_pages_concurrently,
+)
+
+from .utils import table_counts
+
+
+def test_map_in_order_keeps_order_and_bounds_pending_items():
+    running = 0
+    most_running = 0
+    lock = threading.Lock()
+
+    def _pages(item):
+        nonlocal running, most_running
+        with lock:
+            running += 1
+            most_running = max(most_running, running)
+        time.sleep(random.random() / 100)
+        with lock:
+            running -= 1
+        return [[item]]
+
+    results = list(_map_in_order(_pages, list(range(50)), max_workers=4))
+
+    assert results == [[[item]] for item in range(50)]
+    assert most_running <= 4
+
+
+def test_map_in_order_releases_budget_when_closed_early():
+    budget = MemoryBudget(max_pages=2)
+    results = _map_in_order(lambda item: [[item], [item]], list(range(20)), 4, budget)
+    assert next(results) == [[0], [0]]
+    results.close()
+
+    assert (budget.pages, budget.rows, budget.bytes) == (0, 0, 0)
+
+
+def test_read_ahead_producers_stay_within_budget():
+    budget = MemoryBudget(max_pages=2)
+    most_pages = 0
+
+    def _pages(producer):
+        nonlocal most_pages
+        for page in range(10):
+            # room for the page is reserved before it is requested
+            most_pages = max(most_pages, budget.pages)
+            time.sleep(0.001)
+            yield [(producer, page)]
+
+    producers = [_read_ahead(_pages(producer), 4, budget) for producer in range(6)]
+    # the extracting thread takes pages of all resources in turn
+    received = [[] for _ in producers]
+    for _ in range(10):
+        for producer, pages in enumerate(producers):
+            received[producer].extend(next(pages))
+            most_pages = max(most_pages, budget.pages)
+    for pages in producers:
+        pages.close()
+
+    assert received == [
+        [(producer, page) for page in range(10)] for producer in range(6)
+    ]
+    assert most_pages <= 2
+    assert (budget.pages, budget.rows, budget.bytes, budget.leases) == (0, 0, 0, 0)
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_get_pages_concurrently_yields_groups_in_order(mock_api, max_workers):
+    config, base_url = mock_api
+    deal_ids = list(range(1, 41))
+    groups = get_pages_concurrently(
+        [f"deals/{deal_id}/participants" for deal_id in deal_ids],
+        "test",
+        max_workers,
+        client=PipedriveClient("test", base_url=base_url),
+    )
+
+    participants = [[row["id"] for page in pages for row in page] for pages in groups]
+
+    assert participants == [
+        [deal_id * 100 + index for index in range(config.participants)]
+        for deal_id in deal_ids
+    ]
+
+
+def test_fields_pages_are_returned_in_requested_order(mock_api):
+    _, base_url = mock_api
+    fields_entities = list(FIELDS_ENTITIES)
+    random.shuffle(fields_entities)
+
+    all_fields_pages = get_all_fields_pages(
+        fields_entities,
+        "test",
+        ttl=0,
+        client=PipedriveClient("test", base_url=base_url),
+    )
+
+    for fields_entity, (pages, _) in zip(fields_entities, all_fields_pages):
+        keys = {field["key"] for page in pages for field in page}
+        # keys of custom fields are derived from the entity of their endpoint
+        assert _custom_field_key(FIELDS_ENTITIES[fields_entity], 0) in keys
+
+
+def test_concurrent_deal_requests_load_same_rows(mock_api, make_pipeline):
+    config, base_url = mock_api
+    config.rows = 150
+    counts = {}
+    for max_workers in (1, 4):
+        pipeline = make_pipeline(f"max_workers_{max_workers}")
+        source = pipedrive_source(
+            pipedrive_api_key="test", base_url=base_url, max_workers=max_workers
+        )
+        pipeline.run(source.with_resources("deals", "deals_participants", "deals_flow"))
+        counts[max_workers] = table_counts(
+            pipeline,
+            [
+                table
+                for table in pipeline.default_schema.data_table_names()
+                if table.startswith("deals")
+            ],
+        )
+
+    assert counts[4] == counts[1]
+    assert counts[4]["deals_participants"] == config.rows * config.participants
+    assert (
+        sum(
+            rows for table, rows in counts[4].items() if table.startswith("deals_flow_")
+        )
+        == config.rows * config.flow_entries
+    )
+
+
+def test_sources_keep_their_own_client(mock_api, make_pipeline, tmp_path):
+    config, base_url = mock_api
+    config.rows = 50
+    archived = pipedrive_source(
+        pipedrive_api_key="test",
+        base_url=base_url,
+        archive_dir=str(tmp_path / "archive"),
+    )
+    # a second source of the same api token is created before the first one runs
+    other = pipedrive_source(pipedrive_api_key="test", base_url=base_url)
+    make_pipeline("archived").run(archived.with_resources("activities"))
+    make_pipeline("other").run(other.with_resources("persons"))
+
+    # the archive of the first source records only its own scan of /recents
+    archived_files = [path.name for path in (tmp_path / "archive").rglob("*.gz")]
+    assert len([name for name in archived_files if name.startswith("recents")]) == 1
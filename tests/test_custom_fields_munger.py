@@ -0,0 +1,64 @@
+from pipedrive.helpers.custom_fields_munger import get_rename_plan, rename_fields
+
+MAPPING = {
+    "abc_enum": {
+        "name": "custom_enum",
+        "normalized_name": "custom_enum",
+        "options": {"1": "red", "2": "green"},
+        "field_type": "enum",
+    },
+    "abc_set": {
+        "name": "custom_set",
+        "normalized_name": "custom_set",
+        "options": {"3": "small", "4": "large"},
+        "field_type": "set",
+    },
+    "abc_text": {
+        "name": "custom_text",
+        "normalized_name": "custom_text",
+        "options": {},
+        "field_type": "varchar",
+    },
+}
+
+
+def test_rename_in_place():
+    row = {"id": 1, "abc_text": "note"}
+    data = rename_fields([row, {"id": 2}], MAPPING)
+
+    assert data[0] is row
+    assert row == {"id": 1, "custom_text": "note"}
+    assert data[1] == {"id": 2}
+
+
+def test_enum_options_match_integer_ids():
+    data = rename_fields([{"abc_enum": 2}, {"abc_enum": "1"}, {"abc_enum": 9}], MAPPING)
+
+    assert [row["custom_enum"] for row in data] == ["green", "red", 9]
+
+
+def test_set_values_split_from_string():
+    data = rename_fields(
+        [{"abc_set": "3,4"}, {"abc_set": [4, 7]}, {"abc_set": None}], MAPPING
+    )
+
+    assert data[0]["custom_set"] == ["small", "large"]
+    assert data[1]["custom_set"] == ["large", 7]
+    assert data[2]["custom_set"] is None
+
+
+def test_rename_plan_follows_mapping_content():
+    mapping = {key: dict(field) for key, field in MAPPING.items()}
+    plan = get_rename_plan(mapping)
+
+    assert get_rename_plan({key: dict(field) for key, field in MAPPING.items()}) is plan
+
+    mapping["abc_text"]["name"] = "renamed_text"
+    assert get_rename_plan(mapping).names["abc_text"] == "renamed_text"
+
+    mapping["abc_text"]["field_type"] = "enum"
+    mapping["abc_text"]["options"] = {"5": "five"}
+    assert get_rename_plan(mapping).enum_fields[-1] == (
+        "renamed_text",
+        {"5": "five", 5: "five"},
+    )
@@ -0,0 +1,39 @@
+from pipedrive.helpers.deal_fingerprints import (
+    FLOW_FINGERPRINT_FIELDS,
+    deal_fingerprint,
+    get_changed_deals,
+)
+
+DEAL = {
+    "id": 1,
+    "title": "Deal 1",
+    "participants_count": 2,
+    "last_activity_date": None,
+    "stage_id": 3,
+    "update_time": "2024-01-01 00:00:00",
+}
+
+
+def test_flow_requested_for_change_of_other_field():
+    fingerprints = {
+        "1": [deal_fingerprint(DEAL), None],
+    }
+    flow_fingerprints = {
+        "1": [deal_fingerprint(DEAL, FLOW_FINGERPRINT_FIELDS), None],
+    }
+    # only the title changed, which moves the update time
+    changed_deal = dict(DEAL, title="Renamed", update_time="2024-01-02 00:00:00")
+
+    assert get_changed_deals([changed_deal], fingerprints) == []
+    assert get_changed_deals(
+        [changed_deal], flow_fingerprints, FLOW_FINGERPRINT_FIELDS
+    ) == [(changed_deal, deal_fingerprint(changed_deal, FLOW_FINGERPRINT_FIELDS))]
+    assert get_changed_deals([DEAL], flow_fingerprints, FLOW_FINGERPRINT_FIELDS) == []
+
+
+def test_deals_without_fingerprint_fields_always_change():
+    deal = {key: value for key, value in DEAL.items() if key != "stage_id"}
+    fingerprints = {"1": [deal_fingerprint(deal), None]}
+
+    assert deal_fingerprint(deal) is None
+    assert get_changed_deals([deal], fingerprints) == [(deal, None)]
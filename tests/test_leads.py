@@ -0,0 +1,21 @@
+from benchmarks.mock_pipedrive import _custom_field_key
+from pipedrive import pipedrive_source
+
+
+def test_leads_rename_custom_fields_of_deals(mock_api, make_pipeline):
+    config, base_url = mock_api
+    pipeline = make_pipeline()
+    source = pipedrive_source(pipedrive_api_key="test", base_url=base_url)
+    pipeline.run(source.with_resources("custom_fields_mapping", "deals", "leads"))
+
+    schema = pipeline.default_schema
+    hash_columns = {
+        schema.naming.normalize_identifier(_custom_field_key("deal", index))
+        for index in range(config.custom_fields)
+    }
+    deals_columns = set(schema.get_table_columns("deals"))
+    leads_columns = set(schema.get_table_columns("leads"))
+
+    assert not hash_columns & leads_columns
+    # leads carry the custom fields of deals under the same names
+    assert deals_columns - {"id"} <= leads_columns
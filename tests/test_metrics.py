@@ -0,0 +1,18 @@
+from pipedrive import pipedrive_source
+from pipedrive.helpers.memory_budget import MemoryBudget, memory_high_water
+from pipedrive.helpers.metrics import get_metrics, record_request, timed
+
+
+def test_metrics_are_reset_for_each_source():
+    record_request("activities", 0.1, retry=True)
+    with timed("rename_fields"):
+        pass
+    MemoryBudget().lease()
+    assert get_metrics()["endpoints"]["activities"]["retries"] == 1
+
+    pipedrive_source(pipedrive_api_key="test")
+
+    metrics = get_metrics()
+    assert metrics["endpoints"] == {}
+    assert metrics["timings"] == {}
+    assert memory_high_water() == {"pages": 0, "rows": 0, "bytes": 0}
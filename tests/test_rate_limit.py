@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from dlt.sources.helpers.requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from pipedrive.helpers import rate_limit
+from pipedrive.helpers.rate_limit import RateLimiter
+
+
+class FakeClock:
+    """Replaces `time` in the rate limit module, sleeping only moves the clock"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self._lock = threading.Lock()
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        with self._lock:
+            # a real sleep takes some time even when the token is just a rounding error away
+            self.now += max(seconds, 1e-6)
+        # lets other threads take the lock of the limiter
+        time.sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def _response(status_code=200, **headers):
+    response = Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(
+        {name.replace("_", "-"): str(value) for name, value in headers.items()}
+    )
+    return response
+
+
+def test_bucket_refills_at_rate(clock):
+    limiter = RateLimiter(requests_per_second=2.0)
+
+    assert [limiter.acquire() for _ in range(2)] == [0.0, 0.0]
+    # the bucket is empty, the next token comes after 1 / rate seconds
+    assert limiter.acquire() == pytest.approx(0.5)
+    assert clock.now == pytest.approx(0.5)
+
+    # an idle bucket refills up to its capacity only
+    clock.now += 10
+    assert [limiter.acquire() for _ in range(2)] == [0.0, 0.0]
+    assert limiter.acquire() == pytest.approx(0.5)
+    assert limiter.wait_time == pytest.approx(1.0)
+
+
+def test_bucket_follows_rate_limit_headers(clock):
+    limiter = RateLimiter(requests_per_second=2.0)
+    limiter.acquire()
+    limiter.update(
+        _response(x_ratelimit_limit=20, x_ratelimit_remaining=1, x_ratelimit_reset=2)
+    )
+    # 20 requests per 2 seconds window
+    assert limiter.rate == 10.0
+
+    assert limiter.acquire() == 0.0
+    # the budget of the window is used up, requests wait for the window to reset
+    assert limiter.acquire() == pytest.approx(2.0)
+
+
+def test_throttled_response_blocks_all_callers(clock):
+    limiter = RateLimiter(requests_per_second=10.0)
+    limiter.acquire()
+
+    assert limiter.update(_response(429, retry_after=3)) == 3.0
+    assert limiter.throttled == 1
+    assert limiter.acquire() == pytest.approx(3.0)
+
+
+def test_bucket_is_shared_by_workers(clock):
+    limiter = RateLimiter(requests_per_second=10.0)
+
+    def send(_):
+        for _ in range(25):
+            limiter.acquire()
+            limiter.update(_response())
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(send, range(8)))
+
+    assert limiter.requests == 200
+    assert limiter._in_flight == 0
+    assert limiter._tokens > -1e-9
+    # no more tokens were handed out than the bucket held and refilled
+    assert limiter.requests <= limiter.capacity + limiter.rate * clock.now + 1e-6
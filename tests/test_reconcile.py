@@ -0,0 +1,82 @@
+import pytest
+
+from pipedrive import pipedrive_source
+
+from .utils import table_counts
+
+RESOURCES = ["deals", "persons"]
+DELETED_IDS = [3, 7, 10]
+
+
+def _reconcile(pipeline, base_url, arrow_output=False):
+    source = pipedrive_source(
+        pipedrive_api_key="test",
+        base_url=base_url,
+        reconcile_deletes=RESOURCES,
+        arrow_output=arrow_output,
+    )
+    pipeline.run(source.with_resources("deleted_records"))
+
+
+@pytest.mark.parametrize("arrow_output", [False, True])
+def test_reconcile_deletes_records_missing_from_pipedrive(
+    mock_api, make_pipeline, arrow_output
+):
+    config, base_url = mock_api
+    pipeline = make_pipeline()
+    source = pipedrive_source(
+        pipedrive_api_key="test", base_url=base_url, arrow_output=arrow_output
+    )
+    pipeline.run(source.with_resources(*RESOURCES))
+
+    config.deleted_ids = DELETED_IDS
+    _reconcile(pipeline, base_url, arrow_output)
+
+    assert table_counts(pipeline, RESOURCES) == {
+        resource: config.rows - len(DELETED_IDS) for resource in RESOURCES
+    }
+    with pipeline.sql_client() as client:
+        remaining = client.execute_sql(
+            "SELECT id FROM persons WHERE id IN (3, 7, 10, 11)"
+        )
+    assert [row[0] for row in remaining] == [11]
+
+    # records already deleted are not marked again
+    _reconcile(pipeline, base_url, arrow_output)
+    assert not pipeline.last_trace.last_normalize_info.row_counts.get("persons")
+
+
+def test_reconcile_skips_empty_scans(mock_api, make_pipeline):
+    config, base_url = mock_api
+    pipeline = make_pipeline()
+    source = pipedrive_source(pipedrive_api_key="test", base_url=base_url)
+    pipeline.run(source.with_resources(*RESOURCES))
+
+    # an empty scan is more likely a failed request than every record deleted
+    config.deleted_ids = list(range(1, config.rows + 1))
+    _reconcile(pipeline, base_url)
+
+    assert table_counts(pipeline, RESOURCES) == {
+        resource: config.rows for resource in RESOURCES
+    }
+
+
+def test_reconcile_keeps_records_shifted_by_deletes_during_scan(
+    mock_api, make_pipeline
+):
+    config, base_url = mock_api
+    pipeline = make_pipeline()
+    source = pipedrive_source(pipedrive_api_key="test", base_url=base_url)
+    pipeline.run(source.with_resources(*RESOURCES))
+
+    # deals deleted after the first page of deals shift the second page past live deals
+    config.mid_scan_deletes = (500, [3, 7])
+    _reconcile(pipeline, base_url)
+
+    # the deleted deals were in the first page, they are deleted by the next run
+    assert table_counts(pipeline, RESOURCES) == {
+        "deals": config.rows,
+        "persons": config.rows - 2,
+    }
+    _reconcile(pipeline, base_url)
+    assert table_counts(pipeline, ["deals"]) == {"deals": config.rows - 2}
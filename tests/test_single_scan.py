@@ -0,0 +1,102 @@
+import pytest
+
+from pipedrive import pipedrive_source
+from pipedrive.settings import RECENTS_ENTITIES
+
+from .utils import table_counts
+
+# items of all entities are interleaved in the pages of the scan
+RESOURCES = list(RECENTS_ENTITIES.values())
+
+
+@pytest.mark.parametrize("arrow_output", [False, True])
+def test_single_scan_loads_same_rows_as_default_mode(
+    mock_api, make_pipeline, arrow_output
+):
+    config, base_url = mock_api
+    counts = {}
+    for single_scan in (False, True):
+        pipeline = make_pipeline(f"single_scan_{single_scan}")
+        source = pipedrive_source(
+            pipedrive_api_key="test",
+            base_url=base_url,
+            single_scan=single_scan,
+            arrow_output=arrow_output,
+        )
+        pipeline.run(source.with_resources(*RESOURCES))
+        counts[single_scan] = table_counts(pipeline, RESOURCES)
+
+    assert counts[True] == counts[False]
+    assert counts[True]["activities"] == config.rows
+    # configuration entities have few rows whatever the scale
+    assert counts[True]["users"] == 20
+
+
+def test_single_scan_routes_only_selected_resources(mock_api, make_pipeline):
+    config, base_url = mock_api
+    pipeline = make_pipeline()
+    source = pipedrive_source(
+        pipedrive_api_key="test", base_url=base_url, single_scan=True
+    )
+    pipeline.run(source.with_resources("persons", "notes"))
+
+    assert table_counts(pipeline, ["persons", "notes"]) == {
+        "persons": config.rows,
+        "notes": config.rows,
+    }
+    assert "activities" not in pipeline.default_schema.tables
+
+
+def test_single_scan_incremental_run_reloads_no_rows(mock_api, make_pipeline):
+    config, base_url = mock_api
+    pipeline = make_pipeline()
+    for _ in range(2):
+        source = pipedrive_source(
+            pipedrive_api_key="test", base_url=base_url, single_scan=True
+        )
+        pipeline.run(source.with_resources(*RESOURCES))
+    row_counts = pipeline.last_trace.last_normalize_info.row_counts
+
+    # only the rows updated at the last cursor are requested again, merge keeps one copy
+    assert row_counts.get("activities", 0) <= 1
+    assert table_counts(pipeline, ["activities"]) == {"activities": config.rows}
+
+
+def test_single_scan_deals_transformers_load_same_rows(mock_api, make_pipeline):
+    config, base_url = mock_api
+    config.rows = 150
+    counts = {}
+    for single_scan in (False, True):
+        pipeline = make_pipeline(f"single_scan_{single_scan}")
+        source = pipedrive_source(
+            pipedrive_api_key="test", base_url=base_url, single_scan=single_scan
+        )
+        pipeline.run(source.with_resources("deals", "deals_participants", "deals_flow"))
+        counts[single_scan] = table_counts(
+            pipeline,
+            [
+                table
+                for table in pipeline.default_schema.data_table_names()
+                if table.startswith("deals")
+            ],
+        )
+
+    assert counts[True] == counts[False]
+    assert counts[True]["deals"] == config.rows
+    assert counts[True]["deals_participants"] == config.rows * config.participants
+    assert any(table.startswith("deals_flow_") for table in counts[True])
+
+
+def test_single_scan_starts_from_cursors_of_default_mode(mock_api, make_pipeline):
+    config, base_url = mock_api
+    pipeline = make_pipeline()
+    for single_scan in (False, True):
+        source = pipedrive_source(
+            pipedrive_api_key="test", base_url=base_url, single_scan=single_scan
+        )
+        pipeline.run(source.with_resources("activities", "persons"))
+    row_counts = pipeline.last_trace.last_normalize_info.row_counts
+
+    assert row_counts.get("activities", 0) <= 1
+    assert row_counts.get("persons", 0) <= 1
+    assert table_counts(pipeline, ["activities"]) == {"activities": config.rows}
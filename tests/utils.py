@@ -0,0 +1,14 @@
+"""Helpers shared by the tests"""
+
+from typing import Dict, Iterable
+
+import dlt
+
+
+def table_counts(pipeline: dlt.Pipeline, tables: Iterable[str]) -> Dict[str, int]:
+    """Rows of each table in the destination"""
+    with pipeline.sql_client() as client:
+        return {
+            table: client.execute_sql(f"SELECT COUNT(*) FROM {table}")[0][0]
+            for table in tables
+        }